@@ -0,0 +1,47 @@
+# Shared vehicle images
+# Every vehicle PNG is loaded (and convert_alpha()'d) once per process, and all
+# rotation steps a turning vehicle goes through are prepared at the same time,
+# so spawning and turning never touch the disk or call pygame.transform.rotate.
+
+import pygame
+
+rotationAngle = 3       # degrees turned per frame while a vehicle turns
+rotationSteps = 30      # 30 steps of 3 degrees make the 90 degree turn
+
+directions = ('right', 'down', 'left', 'up')
+vehicleClasses = ('car', 'bus', 'truck', 'rickshaw', 'bike')
+
+images = {}         # (direction, vehicleClass) -> Surface
+rotations = {}      # (direction, vehicleClass) -> [Surface rotated by 0, 3, ..., 90 degrees]
+
+def load(direction, vehicleClass):
+    image = pygame.image.load("images/" + direction + "/" + vehicleClass + ".png")
+    if pygame.display.get_surface() is not None:    # convert_alpha() needs a display mode
+        image = image.convert_alpha()
+    return add(direction, vehicleClass, image)
+
+# Use `image` for a vehicle, e.g. a stand-in drawn when its PNG is missing, and prepare its rotations
+def add(direction, vehicleClass, image):
+    key = (direction, vehicleClass)
+    rotations[key] = [pygame.transform.rotate(image, -rotationAngle*step) for step in range(rotationSteps+1)]
+    images[key] = image
+    return image
+
+# Load every vehicle image up front; call after pygame.display.set_mode()
+def preload():
+    for direction in directions:
+        for vehicleClass in vehicleClasses:
+            if (direction, vehicleClass) not in images:
+                load(direction, vehicleClass)
+
+def vehicleImage(direction, vehicleClass):
+    image = images.get((direction, vehicleClass))
+    if image is None:
+        image = load(direction, vehicleClass)
+    return image
+
+def rotatedImage(direction, vehicleClass, angle):
+    key = (direction, vehicleClass)
+    if key not in rotations:
+        load(direction, vehicleClass)
+    return rotations[key][min(int(angle)//rotationAngle, rotationSteps)]
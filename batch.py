@@ -0,0 +1,89 @@
+# Batch scenario runner
+# Expands a grid of engine Settings, runs every combination headless on a
+# process pool (one worker per core by default) and collects the results into
+# one table.
+#
+# The grid is a JSON object of Settings names to lists of values, plus an
+# optional "engine" list ("engine" or "vector"), e.g.
+#   {"seed": [1, 2, 3], "spawnInterval": [0.4, 0.65], "defaultMaximum": [40, 60],
+#    "directionSplit": [[400, 800, 900, 1000], [250, 500, 750, 1000]],
+#    "policy": ["fixed", "pressure", "waiting"]}
+#
+#   python batch.py grid.json results.csv
+
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from engine import Engine, Settings
+
+def engineClass(name):
+    if name == 'engine':
+        return Engine
+    if name == 'vector':
+        from vector_engine import VectorEngine    # needs numpy, so only imported when asked for
+        return VectorEngine
+    raise ValueError("unknown engine %r, expected 'engine' or 'vector'" % name)
+
+# Every combination of the grid values, in a stable order
+def expand(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+# Run one scenario and return a flat row of its parameters and results
+def runOne(params):
+    params = dict(params)
+    cls = engineClass(params.pop('engine', 'engine'))
+    started = time.perf_counter()
+    engine = cls(Settings(**params))
+    results = engine.run()
+    row = dict(params)
+    row['engine'] = cls.__name__
+    for name, value in results.items():
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                row['%s%d' % (name, i+1)] = item
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                row['%s.%s' % (name, key)] = item
+        else:
+            row[name] = value
+    row['wallTime'] = time.perf_counter() - started
+    return row
+
+def runBatch(grid, workers=None):
+    scenarios = expand(grid)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(scenarios) // (workers*4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(runOne, scenarios, chunksize=chunksize))
+
+def writeTable(rows, out):
+    columns = []
+    for row in rows:
+        for name in row:
+            if name not in columns:
+                columns.append(name)
+    writer = csv.DictWriter(out, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({name: ('/'.join(map(str, value)) if isinstance(value, (list, tuple)) else value)
+                         for name, value in row.items()})
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python batch.py grid.json [results.csv]")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        grid = json.load(f)
+    rows = runBatch(grid)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w', newline='') as out:
+            writeTable(rows, out)
+    else:
+        writeTable(rows, sys.stdout)
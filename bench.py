@@ -0,0 +1,239 @@
+# Performance benchmarks
+# Runs a fixed set of scenarios headless and measures the simulator itself, not
+# the traffic: engine ticks per second, vehicle updates per second, frame time
+# percentiles of the pygame renderer (renderer.py, on the dummy video driver
+# unless a display is set), signal decision latency and peak memory.
+# Every scenario runs in its own process so its peak RSS is its own.
+#
+# Results go to a JSON file; given a baseline file from an earlier run, every
+# metric is compared against it and the script exits with status 1 if any got
+# worse by more than the tolerance.
+#
+#   python bench.py results.json                  # run and save
+#   python bench.py results.json baseline.json    # run, save and compare
+#   python bench.py results.json baseline.json 0.1    # shorter runs (scale 0.1) for a quick check
+#   python bench.py results.json baseline.json 1 0.25 # allow 25% before a change counts as a regression
+
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError:     # not on Windows
+    resource = None
+
+from engine import Engine, Settings, directionNumbers, imageSize, rotatedSize
+from policies import TimedPolicy, makePolicy
+
+tolerance = 0.10        # relative change that counts as a regression
+repeats = 3             # engine runs per scenario; the fastest counts, as timing noise only ever slows a run down
+renderFrames = 1800     # frames drawn per scenario for the frame time percentiles
+
+# name -> (engine, Settings options); demand is built in the worker, see makeDemand()
+scenarios = {
+    'light':     ('engine', {'simTime': 600, 'spawnInterval': 2.0}),
+    'default':   ('engine', {'simTime': 600}),
+    'saturated': ('engine', {'simTime': 600, 'spawnInterval': 0.25}),
+    'turning':   ('engine', {'simTime': 600, 'demand': 'turning'}),
+    'vector':    ('vector', {'simTime': 600, 'spawnInterval': 0.25}),
+    'soak':      ('engine', {'simTime': 3600}),
+}
+
+# metric -> True when higher is better
+metrics = {
+    'ticksPerSecond': True,
+    'vehicleUpdatesPerSecond': True,
+    'frameP50Ms': False,
+    'frameP95Ms': False,
+    'frameP99Ms': False,
+    'decisionMeanUs': False,
+    'decisionP99Us': False,
+    'peakRssMb': False,
+}
+
+# Every vehicle arrives in lane 1 or 2 and every lane 2 vehicle turns, about half of all vehicles
+def makeDemand(name):
+    if name == 'turning':
+        from demand import ProfileDemand
+        return ProfileDemand([1400]*4, classMix=[1, 1, 1, 1, 0], turnRatio=1.0)
+    return name
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values)-1, int(q * len(values)))]
+
+def peakRss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0*1024.0) if sys.platform == 'darwin' else rss / 1024.0     # bytes on macOS, KiB elsewhere
+
+def makeEngine(kind, options, seed):
+    options = dict(options, seed=seed)
+    if 'demand' in options:
+        options['demand'] = makeDemand(options['demand'])
+    if kind == 'vector':
+        from vector_engine import VectorEngine
+        return VectorEngine(Settings(**options))
+    return Engine(Settings(**options))
+
+# Vehicle surfaces: the real images when the images folder is here, plain boxes of the same size otherwise
+class Sprites:
+    colours = {'car': (200, 40, 40), 'bus': (40, 40, 200), 'truck': (90, 90, 90), 'rickshaw': (40, 160, 40), 'bike': (220, 180, 0)}
+
+    def __init__(self, pygame):
+        self.pygame = pygame
+        self.images = os.path.isdir('images')
+        self.cache = {}
+
+    def get(self, vehicle):
+        key = (vehicle.direction, vehicle.vehicleClass, vehicle.rotateAngle)
+        surface = self.cache.get(key)
+        if surface is None:
+            if self.images:
+                import assets
+                surface = assets.rotatedImage(vehicle.direction, vehicle.vehicleClass, vehicle.rotateAngle)
+            else:
+                w, h = imageSize(vehicle.direction, vehicle.vehicleClass)
+                surface = self.pygame.Surface(rotatedSize(w, h, vehicle.rotateAngle))
+                surface.fill(self.colours[vehicle.vehicleClass])
+            self.cache[key] = surface
+        return surface
+
+# Milliseconds per frame of the renderer drawing an engine as it runs, with about the Main loop's widgets
+def frameTimes(kind, options, seed, frames):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    try:
+        import pygame
+    except ImportError:
+        return []
+    from engine import screenWidth, screenHeight
+    from renderer import Renderer
+    pygame.init()
+    screen = pygame.display.set_mode((screenWidth, screenHeight))
+    if os.path.exists('images/mod_int.png'):
+        background = pygame.image.load('images/mod_int.png')
+    else:
+        background = pygame.Surface((screenWidth, screenHeight))
+        background.fill((120, 120, 120))
+    font = pygame.font.Font(None, 30)
+    renderer = Renderer(screen, background, font)
+    sprites = Sprites(pygame)
+    engine = makeEngine('engine', options, seed)     # the renderer draws Vehicle objects
+    for tick in range(2*frames):     # let queues build up before timing
+        engine.step()
+    times = []
+    for frame in range(frames):
+        engine.step()
+        started = time.perf_counter()
+        widgets = []
+        for i, signal in enumerate(engine.signals):
+            widgets.append((('timer', i), renderer.text(signal.green if i == engine.controller.currentGreen else signal.red,
+                                                        (255, 255, 255), (0, 0, 0)), (530 + 250*i, 210)))
+            widgets.append((('count', i), renderer.text(engine.vehicles[directionNumbers[i]]['crossed'],
+                                                        (0, 0, 0), (255, 255, 255)), (480 + 250*i, 210 + 40)))
+        widgets.append(('time', renderer.text("Time Elapsed: " + str(engine.timeElapsed), (0, 0, 0), (255, 255, 255)), (1100, 50)))
+        renderer.draw(widgets, [(vehicle.id, sprites.get(vehicle), (vehicle.x, vehicle.y)) for vehicle in engine.simulation])
+        times.append(1e3 * (time.perf_counter() - started))
+        if engine.finished:
+            break
+    pygame.quit()
+    return times
+
+def runScenario(job):
+    name, kind, options, seed, scale = job
+    options = dict(options, simTime=max(1, int(options['simTime'] * scale)))
+    elapsed = None
+    decisions = []
+    for run in range(repeats):
+        engine = makeEngine(kind, options, seed)
+        policy = engine.policy = TimedPolicy(makePolicy(engine.settings.policy))
+        updates = 0
+        started = time.perf_counter()
+        while not engine.finished:
+            updates += engine.onRoad()
+            engine.step()
+        seconds = time.perf_counter() - started
+        engine.close()
+        elapsed = seconds if elapsed is None else min(elapsed, seconds)
+        decisions += [1e6 * t for t in policy.times]
+    frames = frameTimes(kind, options, seed, max(1, int(renderFrames * scale))) if kind == 'engine' else []
+    results = engine.results()
+    return name, {
+        'ticks': results['ticks'],
+        'seconds': elapsed,
+        'ticksPerSecond': results['ticks'] / elapsed,
+        'vehicleUpdatesPerSecond': updates / elapsed,
+        'meanOnRoad': float(updates) / results['ticks'],
+        'crossed': results['totalVehicles'],
+        'frames': len(frames),
+        'frameP50Ms': percentile(frames, 0.50) if frames else None,
+        'frameP95Ms': percentile(frames, 0.95) if frames else None,
+        'frameP99Ms': percentile(frames, 0.99) if frames else None,
+        'decisions': len(decisions),
+        'decisionMeanUs': sum(decisions) / len(decisions) if decisions else None,
+        'decisionP99Us': percentile(decisions, 0.99) if decisions else None,
+        'peakRssMb': peakRss(),
+    }
+
+def runAll(names=None, seed=1, scale=1.0):
+    jobs = [(name, scenarios[name][0], scenarios[name][1], seed, scale) for name in names or scenarios]
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:   # one process per scenario, one at a time
+        rows = pool.map(runScenario, jobs, chunksize=1)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'scale': scale,
+        'scenarios': dict(rows),
+    }
+
+# Rows (scenario, metric, baseline, current, relative change, regressed) for metrics present in both
+def compare(results, baseline, tolerance=tolerance):
+    rows = []
+    for name, current in results['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None:
+            continue
+        for metric, higherIsBetter in metrics.items():
+            a, b = old.get(metric), current.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = -change if higherIsBetter else change
+            rows.append((name, metric, a, b, change, worse > tolerance))
+    return rows
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python bench.py results.json [baseline.json] [scale] [tolerance]")
+        sys.exit(1)
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    tolerance = float(sys.argv[4]) if len(sys.argv) > 4 else tolerance
+    results = runAll(scale=scale)
+    with open(sys.argv[1], 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print('scenario     ticks/s  vehicle updates/s  frame p50/p95/p99 (ms)  decision mean/p99 (us)  peak RSS (MB)')
+    for name, row in results['scenarios'].items():
+        frames = '%5.2f /%5.2f /%5.2f' % (row['frameP50Ms'], row['frameP95Ms'], row['frameP99Ms']) if row['frames'] else '-'
+        print('%-10s %9.0f %18.0f  %-22s  %7.1f / %-12.1f  %6.1f' % (name, row['ticksPerSecond'], row['vehicleUpdatesPerSecond'],
+              frames, row['decisionMeanUs'] or 0, row['decisionP99Us'] or 0, row['peakRssMb'] or 0))
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, tolerance)
+        regressions = [row for row in rows if row[5]]
+        print('\nagainst %s (tolerance %d%%)' % (sys.argv[2], tolerance*100))
+        for name, metric, a, b, change, regressed in rows:
+            print('%-10s %-24s %12.2f %12.2f %+7.1f%%%s' % (name, metric, a, b, 100*change, '  REGRESSION' if regressed else ''))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,149 @@
+# Engine checkpoints
+# Saves the complete state of a headless engine: vehicles, signals and the phase
+# controller, the policy, metrics, counters, the demand source and the RNG.
+# A run can then be paused, resumed after a crash, or forked into any number of
+# what-if branches from one warmed-up state.
+#
+# File layout:
+#   magic TSC1, then two little-endian uint32: vehicle count and state length
+#   vehicle records, one fixed-size struct each (the fields in `vehicleRecord`)
+#   the rest of the engine state, pickled and zlib-compressed
+# Vehicle sizes, speeds, lane lists and indices are rebuilt on load rather than stored.
+# The telemetry writer is not saved; attach a new one after loading if needed.
+#
+#   python checkpoint.py 300 600 7      # warm up seed 7 to 300, then branch every policy to 600
+
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+
+from controller import PhaseController
+from engine import Engine, Settings, Vehicle, directionNumbers, vehicleTypes, speeds, imageSize, rotatedSize
+from policies import builtins, makePolicy
+from spatial import SpatialGrid
+
+magic = b'TSC1'
+header = struct.Struct('<II')
+# id, direction, lane, class, willTurn, crossed, turned, stopped, rotateAngle,
+# x, y, stop, spawnTick, firstStopTick, resumedTick, stops, held
+vehicleRecord = struct.Struct('<qBBBBBBBhdddqqqii')
+vehicleFields = {'id', 'direction_number', 'lane', 'vehicleClass', 'willTurn', 'crossed', 'turned', 'stopped',
+                 'rotateAngle', 'x', 'y', 'stop', 'spawnTick', 'firstStopTick', 'resumedTick', 'stops', 'held',
+                 'engine', 'speed', 'direction', 'originalSize', 'width', 'height', 'index'}
+classNumbers = {vehicleClass: number for number, vehicleClass in vehicleTypes.items()}
+skipped = ('simulation', 'vehicles', 'controller', 'signals', 'grid', 'telemetry', 'profiler', 'step', 'mustYield')
+
+def dumps(engine):
+    records = []
+    extras = {}     # attributes subclasses add to vehicles (network.Junction's trip), by vehicle id
+    for v in engine.simulation:
+        records.append(vehicleRecord.pack(v.id, v.direction_number, v.lane, classNumbers[v.vehicleClass], v.willTurn,
+                                          v.crossed, v.turned, v.stopped, v.rotateAngle, v.x, v.y, v.stop, v.spawnTick,
+                                          v.firstStopTick, v.resumedTick, v.stops, v.held))
+        extra = {name: value for name, value in v.__dict__.items() if name not in vehicleFields}
+        if extra:
+            extras[v.id] = extra
+    controller = dict(engine.controller.__dict__)
+    del controller['engine']
+    state = {name: value for name, value in engine.__dict__.items() if name not in skipped}
+    crossed = {d: lanes['crossed'] for d, lanes in engine.vehicles.items()}
+    state = zlib.compress(pickle.dumps({'class': type(engine), 'engine': state, 'controller': controller,
+                                        'crossed': crossed, 'extras': extras}, pickle.HIGHEST_PROTOCOL), 1)
+    return b''.join([magic, header.pack(len(records), len(state))] + records + [state])
+
+def loads(data):
+    if data[:len(magic)] != magic:
+        raise ValueError("not an engine checkpoint")
+    count, stateLength = header.unpack_from(data, len(magic))
+    offset = len(magic) + header.size
+    start = offset + count*vehicleRecord.size
+    state = pickle.loads(zlib.decompress(data[start:start + stateLength]))
+    engine = state['class'].__new__(state['class'])
+    engine.__dict__.update(state['engine'])
+    engine.telemetry = None
+    engine.profiler = None
+    engine.tracing = engine.events is not None
+    controller = PhaseController.__new__(PhaseController)
+    controller.__dict__.update(state['controller'])
+    controller.engine = engine
+    engine.controller = controller
+    engine.signals = controller.signals
+
+    # Vehicles, in spawn order, which is also their order within each lane
+    engine.vehicles = {d: {0:[], 1:[], 2:[], 'crossed':crossed} for d, crossed in state['crossed'].items()}
+    extras = state['extras']
+    simulation = []
+    for fields in vehicleRecord.iter_unpack(data[offset:offset + count*vehicleRecord.size]):
+        (vid, direction_number, lane, vehicleClass, willTurn, crossed, turned, stopped, rotateAngle,
+         x, y, stop, spawnTick, firstStopTick, resumedTick, stops, held) = fields
+        v = Vehicle.__new__(Vehicle)
+        v.engine = engine
+        v.id = vid
+        v.direction_number = direction_number
+        v.direction = directionNumbers[direction_number]
+        v.lane = lane
+        v.vehicleClass = vehicleTypes[vehicleClass]
+        v.speed = speeds[v.vehicleClass]
+        v.willTurn, v.crossed, v.turned, v.stopped = willTurn, crossed, turned, bool(stopped)
+        v.rotateAngle = rotateAngle
+        v.x, v.y, v.stop = x, y, stop
+        v.spawnTick, v.firstStopTick, v.resumedTick, v.stops, v.held = spawnTick, firstStopTick, resumedTick, stops, held
+        v.originalSize = imageSize(v.direction, v.vehicleClass)
+        v.width, v.height = rotatedSize(v.originalSize[0], v.originalSize[1], rotateAngle) if rotateAngle else v.originalSize
+        v.__dict__.update(extras.get(vid, {}))
+        laneVehicles = engine.vehicles[v.direction][lane]
+        v.index = len(laneVehicles)
+        laneVehicles.append(v)
+        simulation.append(v)
+    engine.simulation = simulation
+    engine.grid = None
+    if engine.settings.conflictChecks:
+        engine.grid = SpatialGrid()
+        engine.grid.rebuild([v for v in simulation if v.crossed])
+    return engine
+
+def save(engine, path):
+    data = dumps(engine)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)     # a crash mid-save leaves the previous checkpoint intact
+
+def load(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+# An independent copy of the engine in its current state
+def fork(engine):
+    return loads(dumps(engine))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("usage: python checkpoint.py warmUpTime simTime [seed] [path]")
+        sys.exit(1)
+    warmUp, simTime = int(sys.argv[1]), int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    path = sys.argv[4] if len(sys.argv) > 4 else 'warm.ckpt'
+    engine = Engine(Settings(simTime=warmUp, seed=seed))
+    engine.run()
+    started = time.perf_counter()
+    save(engine, path)
+    saved = time.perf_counter() - started
+    started = time.perf_counter()
+    load(path)
+    loaded = time.perf_counter() - started
+    print("%d vehicles on the road at %d: %d bytes, saved in %.2f ms, loaded in %.2f ms"
+          % (len(engine.simulation), warmUp, os.path.getsize(path), 1e3*saved, 1e3*loaded))
+    print('policy       crossed  mean wait  max queue')
+    for name in sorted(builtins):
+        branch = load(path)
+        branch.settings.simTime = simTime
+        branch.finished = False
+        branch.policy = branch.settings.policy = makePolicy(name)
+        results = branch.run()
+        overall = branch.metrics.overall.summary()
+        print('%-11s %8d %10.1f %10d' % (name, results['totalVehicles'], overall['meanWait'], overall['maxQueue']))
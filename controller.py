@@ -0,0 +1,135 @@
+# Signal phase controller
+# The cycle that repeat() in simulation.py runs by recursing is kept here as an
+# explicit state machine: GREEN -> YELLOW -> SELECT -> GREEN. The engine calls
+# step() every tick; nothing recurses and nothing sleeps.
+
+GREEN = 'green'
+YELLOW = 'yellow'
+SELECT = 'select'
+
+class TrafficSignal:
+    def __init__(self, red, yellow, green, minimum, maximum):
+        self.red = red
+        self.yellow = yellow
+        self.green = green
+        self.minimum = minimum
+        self.maximum = maximum
+        self.signalText = "30"
+        self.totalGreenTime = 0
+
+# Snapshot of the controller, returned by PhaseController.phase()
+class Phase:
+    def __init__(self, state, currentGreen, nextGreen, remaining, ticksToUpdate):
+        self.state = state                  # GREEN or YELLOW
+        self.currentGreen = currentGreen    # index of the approach being served
+        self.nextGreen = nextGreen
+        self.remaining = remaining          # seconds left on the green/yellow timer
+        self.ticksToUpdate = ticksToUpdate  # ticks until the timer next counts down
+
+    def __repr__(self):
+        return "Phase(%s TS%d, %ds left, next TS%d)" % (self.state, self.currentGreen+1, self.remaining, self.nextGreen+1)
+
+class PhaseController:
+    # engine must provide settings, tick, policy, printStatus(), setTime(), onYellow(index) and onGreen(index)
+    def __init__(self, engine, noOfSignals, greenTicks, yellowTicks):
+        s = engine.settings
+        self.engine = engine
+        self.noOfSignals = noOfSignals
+        self.greenTicks = greenTicks
+        self.yellowTicks = yellowTicks
+        # Initialization of signals with default values, as initialize() does
+        self.signals = []
+        ts1 = TrafficSignal(0, s.defaultYellow, s.defaultGreen, s.defaultMinimum, s.defaultMaximum)
+        self.signals.append(ts1)
+        self.signals.append(TrafficSignal(ts1.red+ts1.yellow+ts1.green, s.defaultYellow, s.defaultGreen, s.defaultMinimum, s.defaultMaximum))
+        for i in range(2, noOfSignals):
+            self.signals.append(TrafficSignal(s.defaultRed, s.defaultYellow, s.defaultGreen, s.defaultMinimum, s.defaultMaximum))
+        self.state = GREEN
+        self.currentGreen = 0
+        self.nextGreen = (self.currentGreen+1)%noOfSignals
+        self.currentYellow = 0
+        self.nextTick = 0
+
+    def phase(self):
+        signal = self.signals[self.currentGreen]
+        remaining = signal.yellow if self.currentYellow else signal.green
+        return Phase(self.state, self.currentGreen, self.nextGreen, remaining, max(0, self.nextTick - self.engine.tick))
+
+    # Advance the state machine; zero-length transitions (yellow -> select -> green) happen in the same tick
+    def step(self):
+        engine = self.engine
+        if engine.policy.realTime:
+            engine.policy.tick(engine)
+        if engine.tick < self.nextTick:
+            return
+        while True:
+            signal = self.signals[self.currentGreen]
+            if self.state == GREEN:
+                if signal.green > 0:    # while the timer of current green signal is not zero
+                    engine.printStatus()
+                    self.updateValues()
+                    if self.signals[(self.currentGreen+1)%self.noOfSignals].red == engine.settings.detectionTime:
+                        engine.setTime()    # set time of next green signal
+                    self.nextTick = engine.tick + self.greenTicks
+                    return
+                self.state = YELLOW
+                self.currentYellow = 1   # set yellow signal on
+                engine.onYellow(self.currentGreen)
+            elif self.state == YELLOW:
+                if signal.yellow > 0:   # while the timer of current yellow signal is not zero
+                    engine.printStatus()
+                    self.updateValues()
+                    self.nextTick = engine.tick + self.yellowTicks
+                    return
+                self.state = SELECT
+                self.currentYellow = 0   # set yellow signal off
+            else:
+                self.select()
+                self.state = GREEN
+                engine.onGreen(self.currentGreen)
+
+    # End the running green now; the yellow starts this tick
+    def endGreen(self):
+        if self.state == GREEN:
+            self.signals[self.currentGreen].green = 0
+            self.nextTick = self.engine.tick
+
+    # Start `ticks` into the cycle, as if the signals had been running before tick 0 (a coordination offset)
+    def fastForward(self, ticks):
+        engine = self.engine
+        tick = engine.tick
+        tracing = engine.tracing
+        engine.tracing = False
+        self.nextTick = tick - ticks
+        for t in range(tick - ticks, tick):
+            engine.tick = t
+            self.step()
+        engine.tick = tick
+        engine.tracing = tracing
+
+    # Reset the finished signal and hand green to the one the policy picks
+    def select(self):
+        s = self.engine.settings
+        signal = self.signals[self.currentGreen]
+        signal.green = s.defaultGreen
+        signal.yellow = s.defaultYellow
+        signal.red = s.defaultRed
+        nextGreen, greenTime = self.engine.policy.choose(self.engine, self.currentGreen)
+        self.currentGreen = nextGreen  # set next signal as green signal
+        if greenTime is not None:
+            self.signals[nextGreen].green = greenTime
+        self.nextGreen = (self.currentGreen+1)%self.noOfSignals    # set next green signal
+        # set the red time of next to next signal as (yellow time + green time) of next signal
+        self.signals[self.nextGreen].red = self.signals[self.currentGreen].yellow+self.signals[self.currentGreen].green
+
+    # Update values of the signal timers after every second
+    def updateValues(self):
+        for i in range(0, self.noOfSignals):
+            if(i==self.currentGreen):
+                if(self.currentYellow==0):
+                    self.signals[i].green-=1
+                    self.signals[i].totalGreenTime+=1
+                else:
+                    self.signals[i].yellow-=1
+            else:
+                self.signals[i].red-=1
@@ -0,0 +1,150 @@
+# Green-wave coordination for a corridor
+# Picks a cycle (green time per approach) and an offset per junction so that a
+# platoon leaving one junction on green reaches the next one on green, in both
+# directions along the corridor ('right' and 'left' approaches). For each
+# candidate cycle the offsets are chosen to maximize the green-wave bandwidth:
+# the part of the cycle in which a vehicle can leave the first junction and
+# pass every junction without stopping, eastbound plus westbound.
+#
+# Bandwidth is only a model, so every plan is then run headless on the
+# network (network.py) for a few seeds, all in parallel, and reported with
+# the stops and travel time of the vehicles driving along the corridor, next
+# to the uncoordinated signals.
+#
+#   python coordination.py 5            # 5-junction corridor, 600 simulated seconds
+#   python coordination.py 5 300 4      # 300 seconds, 4 seeds per plan
+
+import concurrent.futures
+import itertools
+import math
+import os
+import sys
+
+from engine import Settings, screenWidth, speeds, greenInterval, yellowInterval
+from network import runNetwork
+
+# Main street green (approaches right/left) and side street green (down/up) to try, in signal seconds
+mainGreens = (20, 30, 40)
+sideGreens = (10, 20)
+
+class Plan:
+    def __init__(self, greens, offsets, cycle, bandwidth):
+        self.greens = greens        # green time per approach
+        self.offsets = offsets      # ticks after tick 0 at which each junction's 'right' green starts
+        self.cycle = cycle          # ticks
+        self.bandwidth = bandwidth  # (eastbound, westbound) in ticks
+
+    # Plans for network.Junction: (greens, ticks into the cycle at tick 0)
+    def junctionPlans(self):
+        return {(0, j): (self.greens, (self.cycle - offset) % self.cycle) for j, offset in enumerate(self.offsets)}
+
+# Cycle length and the tick each approach's green starts at within the cycle
+def cycleTimes(greens, settings):
+    greenTicks = settings.ticks(greenInterval)
+    yellowTicks = settings.defaultYellow * settings.ticks(yellowInterval)
+    starts = []
+    cycle = 0
+    for green in greens:
+        starts.append(cycle)
+        cycle += green*greenTicks + yellowTicks
+    return cycle, starts
+
+# Ticks from one stop line to the next, screen plus link, at the progression speed
+def travelTicks(settings, linkTime, speed=speeds['car']):
+    return int(math.ceil(screenWidth / float(speed))) + settings.ticks(linkTime)
+
+# Length of the intersection of arcs of equal length on a circle of circumference `cycle`
+def overlap(starts, length, cycle):
+    first = starts[0]
+    low = high = 0
+    for start in starts[1:]:
+        d = (start - first) % cycle
+        if d > cycle/2:
+            d -= cycle
+        low = min(low, d)
+        high = max(high, d)
+    return max(0, length - (high - low))
+
+def bandwidth(offsets, greens, settings, travel):
+    cycle, starts = cycleTimes(greens, settings)
+    greenTicks = settings.ticks(greenInterval)
+    n = len(offsets)
+    east = overlap([(offsets[j] + starts[0] - j*travel) % cycle for j in range(n)], greens[0]*greenTicks, cycle)
+    west = overlap([(offsets[j] + starts[2] - (n-1-j)*travel) % cycle for j in range(n)], greens[2]*greenTicks, cycle)
+    return east, west
+
+# Offsets maximizing two-way bandwidth: coordinate search from the one-way green waves
+def optimizeOffsets(n, greens, settings, travel, sweeps=3):
+    cycle, starts = cycleTimes(greens, settings)
+    step = max(1, cycle // 120)
+    eastWave = [(j*travel) % cycle for j in range(n)]
+    westWave = [(-j*travel) % cycle for j in range(n)]
+    best = None
+    for offsets in (eastWave, westWave, [0]*n):
+        offsets = list(offsets)
+        score = sum(bandwidth(offsets, greens, settings, travel))
+        for sweep in range(sweeps):
+            for j in range(1, n):
+                for candidate in range(0, cycle, step):
+                    trial = offsets[:j] + [candidate] + offsets[j+1:]
+                    value = sum(bandwidth(trial, greens, settings, travel))
+                    if value > score:
+                        offsets, score = trial, value
+        if best is None or score > best[0]:
+            best = (score, offsets)
+    offsets = best[1]
+    return Plan(list(greens), offsets, cycle, bandwidth(offsets, greens, settings, travel))
+
+# Best plan for every candidate cycle, widest bandwidth first
+def candidatePlans(n, settings, linkTime=2.0):
+    travel = travelTicks(settings, linkTime)
+    plans = []
+    for main, side in itertools.product(mainGreens, sideGreens):
+        plans.append(optimizeOffsets(n, (main, side, main, side), settings, travel))
+    plans.sort(key=lambda plan: -sum(plan.bandwidth))
+    return plans
+
+def runPlan(job):
+    n, simTime, seed, linkTime, plans = job
+    return runNetwork(1, n, Settings(simTime=simTime, seed=seed), linkTime, plans)
+
+# Run every plan (None = uncoordinated signals) for every seed on a process pool; averages per plan
+def evaluate(plans, n, simTime=600, seeds=(1, 2), linkTime=2.0, workers=None):
+    jobs = [(n, simTime, seed, linkTime, plan.junctionPlans() if plan else None) for plan in plans for seed in seeds]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        results = list(pool.map(runPlan, jobs))
+    rows = []
+    for i, plan in enumerate(plans):
+        runs = results[i*len(seeds):(i+1)*len(seeds)]
+        row = {}
+        for name in ('throughTravelTime', 'throughStops'):
+            for d, label in ((0, 'East'), (2, 'West')):
+                row[name + label] = sum(run[name][d] for run in runs) / len(runs)
+        row['stopsPerTrip'] = sum(run['stopsPerTrip'] for run in runs) / len(runs)
+        row['meanTravelTime'] = sum(run['meanTravelTime'] for run in runs) / len(runs)
+        row['exited'] = sum(run['exited'] for run in runs) / float(len(runs))
+        rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python coordination.py junctions [simTime] [seeds]")
+        sys.exit(1)
+    n = int(sys.argv[1])
+    simTime = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    seeds = range(1, 1 + (int(sys.argv[3]) if len(sys.argv) > 3 else 2))
+    settings = Settings()
+    plans = [None] + candidatePlans(n, settings)
+    rows = evaluate(plans, n, simTime, seeds)
+    frameRate = float(settings.frameRate)
+    print('greens          cycle  band E/W (s)   offsets (s)                    travel E/W (s)   stops E/W   stops/trip')
+    for plan, row in zip(plans, rows):
+        if plan is None:
+            label = '%-15s %5s  %-13s  %-30s' % ('uncoordinated', '-', '-', '-')
+        else:
+            label = '%-15s %5.0f  %5.1f / %-5.1f  %-30s' % ('/'.join(map(str, plan.greens)), plan.cycle/frameRate,
+                    plan.bandwidth[0]/frameRate, plan.bandwidth[1]/frameRate,
+                    ' '.join('%.0f' % (offset/frameRate) for offset in plan.offsets))
+        print('%s %6.1f / %-6.1f %4.2f / %-4.2f %6.2f' % (label, row['throughTravelTimeEast'], row['throughTravelTimeWest'],
+              row['throughStopsEast'], row['throughStopsWest'], row['stopsPerTrip']))
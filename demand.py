@@ -0,0 +1,376 @@
+# Demand sources
+# By default the engine spawns vehicles like generateVehicles() in simulation.py:
+# one random vehicle every spawnInterval. A demand source replaces that spawner.
+# The engine calls it only at the ticks it asks for:
+#   start(engine)   once, when the engine is built
+#   arrivals(tick)  vehicles due at or before tick, as (direction number, lane, class number, will turn)
+#   nextTick()      tick of the next arrival, None once there are no more
+#   close()         the engine is done with it
+#
+# TraceDemand replays recorded arrivals (loop detector logs) from a trace file.
+# The file is streamed in chunks, so memory stays bounded however long the trace is.
+# Two formats, told apart by their first bytes:
+#   CSV     header time,approach,lane,class,turn; one arrival per row. time is in
+#           seconds from the start of the trace; approach is right/down/left/up or
+#           0-3; lane is 0-2; class is car/bus/truck/rickshaw/bike or 0-4; turn is 0/1
+#   binary  the 4-byte magic TSA1, then 12-byte little-endian records
+#           (float64 time, uint8 approach, lane, class, turn)
+# Rows must be in time order.
+#
+# ProfileDemand draws arrivals from a Poisson process per approach whose rate
+# follows a curve over the day (peakCurve() builds AM/PM peaks), with a class mix
+# and turn ratio per approach. Arrivals are drawn with NumPy, a window of
+# simulated time at a time, so the spawner only walks a list on each tick.
+#
+# Settings(demand=...) takes a trace path or a Demand instance (one engine per instance).
+#
+#   python demand.py record trace.csv 300 7     # arrivals of the synthetic spawner, seed 7
+#   python demand.py convert trace.csv trace.bin
+#   python demand.py replay trace.bin 86400     # replay a day headless
+#   python demand.py profile 16000 7            # 06:00 to about 09:00 of the commuter profile, seed 7
+#
+# Times in traces and profiles are ticks / frameRate seconds. simTime counts the
+# elapsed-time clock, which like simulationTime() advances every 0.66 s.
+
+import bisect
+import csv
+import math
+import struct
+import sys
+
+# Same order as directionNumbers and vehicleTypes in engine.py
+approaches = ('right', 'down', 'left', 'up')
+vehicleClasses = ('car', 'bus', 'truck', 'rickshaw', 'bike')
+
+magic = b'TSA1'
+record = struct.Struct('<dBBBB')
+header = ['time', 'approach', 'lane', 'class', 'turn']
+
+class Demand:
+    def start(self, engine):
+        pass
+
+    def arrivals(self, tick):
+        return ()
+
+    def nextTick(self):
+        return None
+
+    def close(self):
+        pass
+
+def lookup(value, names, field):
+    if value in names:
+        return names.index(value)
+    if not value.isdigit() or int(value) >= len(names):
+        raise ValueError("unknown %s %r" % (field, value))
+    return int(value)
+
+def readCsv(path, chunkSize, skip=0):
+    with open(path, newline='', buffering=chunkSize*32) as f:
+        rows = csv.reader(f)
+        if next(rows, None) != header:
+            raise ValueError("%s: expected the header %s" % (path, ','.join(header)))
+        for line, row in enumerate(rows, 2):
+            if not row:
+                continue
+            if skip:    # arrivals already read; blank lines do not count
+                skip -= 1
+                continue
+            try:
+                time, approach, lane, vehicleClass, turn = row
+                lane = int(lane)
+                if not 0 <= lane <= 2:
+                    raise ValueError("lane %r out of range" % lane)
+                yield (float(time), lookup(approach, approaches, 'approach'), lane,
+                       lookup(vehicleClass, vehicleClasses, 'class'), int(turn))
+            except ValueError as e:
+                raise ValueError("%s:%d: %s" % (path, line, e))
+
+def readBinary(path, chunkSize, skip=0):
+    with open(path, 'rb') as f:
+        f.seek(len(magic) + record.size * skip)
+        while True:
+            chunk = f.read(record.size * chunkSize)
+            if not chunk:
+                return
+            if len(chunk) % record.size:
+                raise ValueError("%s: truncated record at the end of the file" % path)
+            for arrival in record.iter_unpack(chunk):
+                if arrival[1] >= len(approaches) or arrival[2] > 2 or arrival[3] >= len(vehicleClasses):
+                    raise ValueError("%s: bad record %r" % (path, arrival))
+                yield arrival
+
+# Arrivals (time, approach, lane, class, turn) of a trace file, read chunkSize records at a time,
+# after skipping the first `skip` rows
+def readArrivals(path, chunkSize=4096, skip=0):
+    with open(path, 'rb') as f:
+        binary = f.read(len(magic)) == magic
+    return readBinary(path, chunkSize, skip) if binary else readCsv(path, chunkSize, skip)
+
+# Write arrivals to a trace file; binary when the path ends in .bin
+def writeArrivals(path, arrivals):
+    if path.endswith('.bin'):
+        with open(path, 'wb') as f:
+            f.write(magic)
+            for arrival in arrivals:
+                f.write(record.pack(*arrival))
+    else:
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for time, approach, lane, vehicleClass, turn in arrivals:
+                writer.writerow(['%.3f' % time, approaches[approach], lane, vehicleClasses[vehicleClass], turn])
+
+# Replays a trace file; arrivals before `offset` seconds are skipped, the rest shift to start at tick 0
+class TraceDemand(Demand):
+    def __init__(self, path, offset=0.0, chunkSize=4096):
+        self.path = path
+        self.offset = offset
+        self.chunkSize = chunkSize
+        self.records = None
+        self.consumed = 0       # arrivals read so far (blank CSV lines not counted)
+        self.pending = None     # next arrival, read ahead: (tick, approach, lane, class, turn)
+
+    def start(self, engine):
+        self.frameRate = engine.settings.frameRate
+        self.records = readArrivals(self.path, self.chunkSize)
+        self.advance()
+
+    # Checkpoints (checkpoint.py) keep the position in the file rather than the open reader
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['records'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.consumed:
+            self.records = readArrivals(self.path, self.chunkSize, self.consumed)
+
+    def advance(self):
+        if self.records is None:
+            self.pending = None
+            return
+        for time, approach, lane, vehicleClass, turn in self.records:
+            self.consumed += 1
+            if time >= self.offset:
+                self.pending = (int(round((time - self.offset) * self.frameRate)), approach, lane, vehicleClass, turn)
+                return
+        self.pending = None
+
+    def arrivals(self, tick):
+        due = []
+        while self.pending is not None and self.pending[0] <= tick:
+            due.append(self.pending[1:])
+            self.advance()
+        return due
+
+    def nextTick(self):
+        return self.pending[0] if self.pending is not None else None
+
+    def close(self):
+        if self.records is not None:
+            self.records.close()
+
+# A rate curve in vehicles per hour: base all day, rising to peak at each of `peaks` (seconds
+# since midnight) and back over `width` seconds either side, as (time, rate) points every `step`
+def peakCurve(base, peak, peaks=(8*3600, 17.5*3600), width=7200, step=900, period=86400):
+    points = []
+    for t in range(0, period + step, step):
+        rise = 0.0
+        for center in peaks:
+            d = abs(t - center)
+            d = min(d, period - d)
+            if d < width:
+                rise = max(rise, 0.5 * (1 + math.cos(math.pi * d / width)))
+        points.append((t, base + (peak - base) * rise))
+    return points
+
+# Time-varying Poisson arrivals per approach
+#   rates       per approach (right, down, left, up): vehicles per hour, a constant or a
+#               list of (seconds, rate) points joined linearly, held flat past the ends
+#   classMix    per approach, relative weights of car, bus, truck, rickshaw, bike; or one list for all
+#   turnRatio   share of lane 2 vehicles that turn, per approach or one value for all
+#   period      seconds after which the curves repeat (86400 for daily curves), None for no repeat
+#   startTime   profile time (seconds) at tick 0, e.g. 6*3600 to start at 06:00
+#   window      seconds of arrivals drawn per batch
+# Lanes follow generateVehicles(): bikes in lane 0, every other class in lane 1 or 2.
+# The seed defaults to the engine's.
+class ProfileDemand(Demand):
+    def __init__(self, rates, classMix=None, turnRatio=0.6, period=None, startTime=0.0, window=900.0, seed=None):
+        self.rates = [[(0.0, float(rate))] if isinstance(rate, (int, float)) else [(float(t), float(r)) for t, r in rate]
+                      for rate in rates]
+        if classMix is None:
+            classMix = [1]*len(vehicleClasses)
+        if isinstance(classMix[0], (int, float)):
+            classMix = [classMix]*len(approaches)
+        self.classMix = [[weight/float(sum(mix)) for weight in mix] for mix in classMix]
+        self.turnRatio = list(turnRatio) if isinstance(turnRatio, (list, tuple)) else [turnRatio]*len(approaches)
+        self.period = period
+        self.startTime = startTime
+        self.window = window
+        self.seed = seed
+        self.ticks = []         # current batch, in arrival order
+        self.batch = []
+        self.next = 0           # index of the next arrival in the batch
+        self.windowStart = startTime
+
+    def start(self, engine):
+        import numpy as np      # only needed by this demand source
+        self.np = np
+        self.frameRate = engine.settings.frameRate
+        self.rng = np.random.default_rng(self.seed if self.seed is not None else engine.settings.seed)
+        self.curves = [(np.array([t for t, r in rate]), np.array([r for t, r in rate])) for rate in self.rates]
+        # every rate 0, repeating or not: nothing ever arrives
+        if all(ys.max() <= 0 for xs, ys in self.curves):
+            self.end = self.startTime
+        # no repeat and every curve ends at 0: no arrivals after the last point
+        elif self.period is None and all(ys[-1] <= 0 for xs, ys in self.curves):
+            self.end = max(xs[-1] for xs, ys in self.curves)
+        else:
+            self.end = None
+        self.refill()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('np', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'rng' in state:
+            import numpy as np
+            self.np = np
+
+    def rate(self, d, t):
+        xs, ys = self.curves[d]
+        if self.period is not None:
+            t = t % self.period
+        return self.np.interp(t, xs, ys)
+
+    # Highest rate of an approach in [t0, t1): the curve is piecewise linear, so at an end or a point
+    def highest(self, d, t0, t1):
+        np = self.np
+        xs, ys = self.curves[d]
+        best = max(self.rate(d, t0), self.rate(d, t1))
+        if self.period is None:
+            inside = (xs >= t0) & (xs < t1)
+        else:
+            offset = (xs - t0) % self.period
+            inside = offset < t1 - t0
+        if inside.any():
+            best = max(best, ys[inside].max())
+        return best
+
+    # Draw the next window of arrivals for every approach by thinning a Poisson process at the peak rate
+    def draw(self, t0, t1):
+        np = self.np
+        rng = self.rng
+        times, columns = [], []
+        for d in range(len(approaches)):
+            peak = self.highest(d, t0, t1) / 3600.0
+            if peak <= 0:
+                continue
+            t = rng.uniform(t0, t1, rng.poisson(peak * (t1 - t0)))
+            t = t[rng.random(len(t)) * peak < self.rate(d, t) / 3600.0]
+            n = len(t)
+            vehicleClass = rng.choice(len(vehicleClasses), n, p=self.classMix[d])
+            lane = np.where(vehicleClass == vehicleClasses.index('bike'), 0, rng.integers(1, 3, n))
+            turn = ((lane == 2) & (rng.random(n) < self.turnRatio[d])).astype(int)
+            times.append(t)
+            columns.append(np.stack([np.full(n, d), lane, vehicleClass, turn], axis=1))
+        if not times:
+            return [], []
+        t = np.concatenate(times)
+        order = np.argsort(t, kind='stable')
+        ticks = np.round((t[order] - self.startTime) * self.frameRate).astype(np.int64)
+        return ticks.tolist(), [tuple(row) for row in np.concatenate(columns)[order].tolist()]
+
+    def refill(self):
+        while True:
+            t0 = self.windowStart
+            if self.end is not None and t0 >= self.end:
+                self.ticks, self.batch, self.next = [], [], 0
+                return
+            self.windowStart = t0 + self.window
+            self.ticks, self.batch = self.draw(t0, self.windowStart)
+            self.next = 0
+            if self.ticks:
+                return
+
+    def arrivals(self, tick):
+        if self.next >= len(self.ticks):
+            return ()
+        end = bisect.bisect_right(self.ticks, tick, self.next)
+        due = self.batch[self.next:end]
+        self.next = end
+        if end == len(self.ticks):
+            self.refill()
+        return due
+
+    def nextTick(self):
+        return self.ticks[self.next] if self.next < len(self.ticks) else None
+
+# Weekday profile: base and peak rates spread over the approaches like Settings.directionSplit,
+# around 5540 vehicles per hour at the peaks, as many as the fixed spawner makes
+def commuterProfile(base=1500, peak=5540, split=(400, 800, 900, 1000), **options):
+    shares = [(split[i] - (split[i-1] if i else 0)) / 1000.0 for i in range(len(approaches))]
+    curve = peakCurve(base, peak)
+    rates = [[(t, r * share) for t, r in curve] for share in shares]
+    options.setdefault('period', 86400)
+    return ProfileDemand(rates, **options)
+
+def makeDemand(demand):
+    if not isinstance(demand, str):
+        return demand
+    return TraceDemand(demand)
+
+# Arrivals the built-in spawner makes for these settings, as trace rows
+def recordArrivals(settings):
+    from engine import Engine       # engine imports this module
+    settings.recordEvents = True
+    engine = Engine(settings)
+    engine.run()
+    frameRate = float(settings.frameRate)
+    return [(event[0]/frameRate,) + event[3:7] for event in engine.events if event[1] == 'spawn']
+
+
+if __name__ == '__main__':
+    usage = ("usage: python demand.py record trace [simTime] [seed] | convert source target | replay trace [simTime]"
+             " | profile simTime [seed]")
+    if len(sys.argv) < 3:
+        print(usage)
+        sys.exit(1)
+    command, path = sys.argv[1], sys.argv[2]
+    if command == 'record':
+        from engine import Settings
+        simTime = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        arrivals = recordArrivals(Settings(simTime=simTime, seed=seed))
+        writeArrivals(path, arrivals)
+        print("%d arrivals written to %s" % (len(arrivals), path))
+    elif command == 'convert' and len(sys.argv) > 3:
+        writeArrivals(sys.argv[3], readArrivals(path))
+    elif command == 'replay':
+        from engine import Engine, Settings
+        simTime = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+        engine = Engine(Settings(simTime=simTime, demand=path))
+        engine.run()
+        engine.report()
+    elif command == 'profile':
+        from engine import Engine, Settings
+        simTime = int(path)
+        seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        engine = Engine(Settings(simTime=simTime, seed=seed, demand=commuterProfile(startTime=6*3600)))
+        spawned = []
+        while not engine.finished:
+            engine.step()
+            if engine.tick % (engine.settings.frameRate * 900) == 0:
+                spawned.append(engine.spawned - sum(spawned))
+        engine.close()
+        print("vehicles spawned per 15 minutes from 06:00: %s" % ' '.join(map(str, spawned)))
+        engine.report()
+    else:
+        print(usage)
+        sys.exit(1)
@@ -0,0 +1,664 @@
+# Headless simulation engine
+# Same signal, spawning and movement rules as simulation.py, but with no pygame
+# and no threads: everything is driven by a discrete tick counter from step(),
+# so a run goes as fast as the CPU allows and needs no display.
+#
+# One tick == one frame of the Main loop (one call to move() per vehicle).
+# The sleeps used by the threads in simulation.py are converted to whole
+# ticks using Settings.frameRate.
+
+import functools
+import hashlib
+import math
+import random
+import sys
+import time
+
+from controller import PhaseController
+from metrics import Metrics
+from demand import makeDemand
+from policies import makePolicy
+from spatial import SpatialGrid
+from telemetry import TelemetryWriter, StatusPrintSink
+
+# Default values of signal times
+defaultRed = 150
+defaultYellow = 5
+defaultGreen = 20
+defaultMinimum = 10
+defaultMaximum = 60
+
+noOfSignals = 4
+simTime = 300       # change this to change time of simulation
+
+# Average times for vehicles to pass the intersection
+carTime = 2
+bikeTime = 1
+rickshawTime = 2.25
+busTime = 2.5
+truckTime = 2.5
+noOfLanes = 2
+
+# Red signal time at which cars will be detected at a signal
+detectionTime = 5
+
+speeds = {'car':4, 'bus':3, 'truck':3, 'rickshaw':4, 'bike':4.5}  # average speeds of vehicles
+
+# Coordinates of start
+startX = {'right':[0,0,0], 'down':[755,727,697], 'left':[1400,1400,1400], 'up':[602,627,657]}
+startY = {'right':[348,370,398], 'down':[0,0,0], 'left':[498,466,436], 'up':[800,800,800]}
+
+vehicleTypes = {0:'car', 1:'bus', 2:'truck', 3:'rickshaw', 4:'bike'}
+directionNumbers = {0:'right', 1:'down', 2:'left', 3:'up'}
+
+# Coordinates of stop lines
+stopLines = {'right': 590, 'down': 330, 'left': 800, 'up': 535}
+defaultStop = {'right': 580, 'down': 320, 'left': 810, 'up': 545}
+
+mid = {'right': {'x':705, 'y':445}, 'down': {'x':695, 'y':450}, 'left': {'x':695, 'y':425}, 'up': {'x':695, 'y':400}}
+rotationAngle = 3
+headings = {'right': (1,0), 'down': (0,1), 'left': (-1,0), 'up': (0,-1)}       # (dx, dy) of travel
+turnHeadings = {'right': (0,1), 'down': (-1,0), 'left': (0,-1), 'up': (1,0)}   # (dx, dy) once turned
+
+# Gap between vehicles
+gap = 15    # stopping gap
+gap2 = 15   # moving gap
+maxHold = 2     # seconds a vehicle gives way inside the junction before it goes anyway
+
+screenWidth = 1400
+screenHeight = 800
+
+# (width, height) of each vehicle image as drawn for 'right'/'left'.
+# 'down'/'up' images are the same vehicle stood on end. Matches the fallback
+# sizes used by test.py when images are missing.
+vehicleSizes = {'bike':(35,15), 'rickshaw':(40,22), 'car':(50,25), 'bus':(80,30), 'truck':(90,35)}
+
+# Wall-clock intervals (seconds) of the threads in simulation.py
+greenInterval = 0.84     # repeat() while green
+yellowInterval = 0.66    # repeat() while yellow
+spawnInterval = 0.65     # generateVehicles()
+clockInterval = 0.66     # simulationTime()
+
+
+def imageSize(direction, vehicleClass):
+    """Size of the unrotated vehicle image for a direction."""
+    w, h = vehicleSizes[vehicleClass]
+    if direction in ('down', 'up'):
+        return h, w
+    return w, h
+
+@functools.lru_cache(maxsize=None)     # only 30 angles per vehicle size are ever used
+def rotatedSize(w, h, angle):
+    """Bounding box of a w x h image rotated by angle degrees, as pygame.transform.rotate computes it."""
+    if angle % 90 == 0:
+        if (angle // 90) % 2:
+            return h, w
+        return w, h
+    rad = math.radians(angle)
+    c, s = abs(math.cos(rad)), abs(math.sin(rad))
+    return int(c*w + s*h), int(s*w + c*h)
+
+
+# Whether `other` is wholly behind `vehicle` along the heading of vehicle's approach
+def behind(other, vehicle):
+    dx, dy = headings[vehicle.direction]
+    if dx > 0:
+        return other.x + other.width <= vehicle.x
+    if dx < 0:
+        return other.x >= vehicle.x + vehicle.width
+    if dy > 0:
+        return other.y + other.height <= vehicle.y
+    return other.y >= vehicle.y + vehicle.height
+
+class Settings:
+    def __init__(self, simTime=simTime, frameRate=60, defaultRed=defaultRed, defaultYellow=defaultYellow,
+                 defaultGreen=defaultGreen, defaultMinimum=defaultMinimum, defaultMaximum=defaultMaximum,
+                 detectionTime=detectionTime, spawnInterval=spawnInterval, directionSplit=(400,800,900,1000),
+                 seed=None, recordEvents=False, verbose=False, policy='fixed', conflictChecks=False,
+                 demand=None):
+        self.simTime = simTime
+        self.frameRate = frameRate      # ticks per simulated second
+        self.defaultRed = defaultRed
+        self.defaultYellow = defaultYellow
+        self.defaultGreen = defaultGreen
+        self.defaultMinimum = defaultMinimum
+        self.defaultMaximum = defaultMaximum
+        self.detectionTime = detectionTime
+        self.spawnInterval = spawnInterval
+        self.directionSplit = list(directionSplit)   # cumulative, out of 1000 (the `a` list in generateVehicles())
+        self.seed = seed                # seed of the vehicle-draw RNG; None draws from the OS
+        self.recordEvents = recordEvents    # keep every event in Engine.events
+        self.verbose = verbose          # print signal status like printStatus(), through a telemetry sink
+        self.policy = policy            # signal control policy, a name from policies.builtins or a Policy
+        self.conflictChecks = conflictChecks    # turning vehicles give way inside the junction (see Engine.mustYield)
+        self.demand = demand            # None spawns like generateVehicles(); a trace path or a demand.Demand
+
+    def ticks(self, seconds):
+        return max(1, int(round(seconds * self.frameRate)))
+
+
+class Vehicle:
+    def __init__(self, engine, lane, vehicleClass, direction_number, direction, will_turn):
+        self.engine = engine
+        self.lane = lane
+        self.vehicleClass = vehicleClass
+        self.speed = speeds[vehicleClass]
+        self.direction_number = direction_number
+        self.direction = direction
+        engine.resetSpawn(direction, lane)
+        self.x = engine.x[direction][lane]
+        self.y = engine.y[direction][lane]
+        self.crossed = 0
+        self.willTurn = will_turn
+        self.turned = 0
+        self.rotateAngle = 0
+        self.id = engine.spawned
+        self.spawnTick = engine.tick
+        self.firstStopTick = -1     # tick of the first stop before the stop line, -1 if none yet
+        self.stops = 0
+        self.stopped = False
+        self.resumedTick = 0
+        self.held = 0               # ticks spent giving way to a conflicting vehicle
+        self.originalSize = imageSize(direction, vehicleClass)
+        self.width, self.height = self.originalSize
+        vehicles = engine.vehicles
+        vehicles[direction][lane].append(self)
+        engine.waiting[direction_number][vehicleClass] += 1
+        engine.laneWaiting[direction_number][lane][vehicleClass] += 1
+        self.index = len(vehicles[direction][lane]) - 1
+
+        laneVehicles = vehicles[direction][lane]
+        ahead = laneVehicles[self.index-1] if self.index > 0 else None
+        if(direction=='right'):
+            if(ahead is not None and ahead.crossed==0):
+                self.stop = ahead.stop - ahead.width - gap
+            else:
+                self.stop = defaultStop[direction]
+        elif(direction=='left'):
+            if(ahead is not None and ahead.crossed==0):
+                self.stop = ahead.stop + ahead.width + gap
+            else:
+                self.stop = defaultStop[direction]
+        elif(direction=='down'):
+            if(ahead is not None and ahead.crossed==0):
+                self.stop = ahead.stop - ahead.height - gap
+            else:
+                self.stop = defaultStop[direction]
+        elif(direction=='up'):
+            if(ahead is not None and ahead.crossed==0):
+                self.stop = ahead.stop + ahead.height + gap
+            else:
+                self.stop = defaultStop[direction]
+        engine.simulation.append(self)
+
+    # Whether move() turns the vehicle this tick (or it is part way through its turn) rather than driving straight
+    def turning(self):
+        if not self.willTurn or self.turned or not self.crossed:
+            return False
+        if self.rotateAngle:
+            return True
+        direction = self.direction
+        if direction == 'right':
+            return self.x + self.width >= mid[direction]['x']
+        if direction == 'down':
+            return self.y + self.height >= mid[direction]['y']
+        if direction == 'left':
+            return self.x <= mid[direction]['x']
+        return self.y <= mid[direction]['y']
+
+    def offScreen(self):
+        return self.x>screenWidth or self.y>screenHeight or self.x+self.width<0 or self.y+self.height<0
+
+    def rotate(self):
+        self.rotateAngle += rotationAngle
+        self.width, self.height = rotatedSize(self.originalSize[0], self.originalSize[1], self.rotateAngle)
+        if self.engine.tracing:
+            if self.rotateAngle == rotationAngle:
+                self.engine.emit('turnStart', self.id, self.direction_number, self.lane)
+            elif self.rotateAngle == 90:
+                self.engine.emit('turnEnd', self.id, self.direction_number, self.lane)
+
+    def cross(self):
+        engine = self.engine
+        self.crossed = 1
+        engine.vehicles[self.direction]['crossed'] += 1
+        engine.waiting[self.direction_number][self.vehicleClass] -= 1
+        engine.laneWaiting[self.direction_number][self.lane][self.vehicleClass] -= 1
+        engine.metrics.crossed(self.direction_number, self.spawnTick, self.firstStopTick, self.stops, engine.tick, self.stopped)
+        self.stopped = False
+        if engine.tracing:
+            wait = (engine.tick - self.firstStopTick) / engine.settings.frameRate if self.firstStopTick >= 0 else 0.0
+            engine.emit('cross', self.id, self.direction_number, self.lane, wait)
+
+    # Port of simulation.Vehicle.move() with image rects replaced by width/height
+    def move(self):
+        engine = self.engine
+        controller = engine.controller
+        green = controller.currentGreen == self.direction_number and controller.currentYellow == 0
+        ahead = engine.vehicles[self.direction][self.lane][self.index-1] if self.index > 0 else None
+        if(self.direction=='right'):
+            if(self.crossed==0 and self.x+self.width>stopLines[self.direction]):
+                self.cross()
+            if(self.willTurn==1):
+                if(self.crossed==0 or self.x+self.width<mid[self.direction]['x']):
+                    if((self.x+self.width<=self.stop or green or self.crossed==1) and (ahead is None or self.x+self.width<(ahead.x - gap2) or ahead.turned==1)):
+                        self.x += self.speed
+                else:
+                    if(self.turned==0):
+                        self.rotate()
+                        self.x += 2
+                        self.y += 1.8
+                        if(self.rotateAngle==90):
+                            self.turned = 1
+                    else:
+                        if(ahead is None or self.y+self.height<(ahead.y - gap2) or self.x+self.width<(ahead.x - gap2)):
+                            self.y += self.speed
+            else:
+                if((self.x+self.width<=self.stop or self.crossed == 1 or green) and (ahead is None or self.x+self.width<(ahead.x - gap2) or (ahead.turned==1))):
+                    self.x += self.speed
+
+        elif(self.direction=='down'):
+            if(self.crossed==0 and self.y+self.height>stopLines[self.direction]):
+                self.cross()
+            if(self.willTurn==1):
+                if(self.crossed==0 or self.y+self.height<mid[self.direction]['y']):
+                    if((self.y+self.height<=self.stop or green or self.crossed==1) and (ahead is None or self.y+self.height<(ahead.y - gap2) or ahead.turned==1)):
+                        self.y += self.speed
+                else:
+                    if(self.turned==0):
+                        self.rotate()
+                        self.x -= 2.5
+                        self.y += 2
+                        if(self.rotateAngle==90):
+                            self.turned = 1
+                    else:
+                        if(ahead is None or self.x>(ahead.x + ahead.width + gap2) or self.y<(ahead.y - gap2)):
+                            self.x -= self.speed
+            else:
+                if((self.y+self.height<=self.stop or self.crossed == 1 or green) and (ahead is None or self.y+self.height<(ahead.y - gap2) or (ahead.turned==1))):
+                    self.y += self.speed
+
+        elif(self.direction=='left'):
+            if(self.crossed==0 and self.x<stopLines[self.direction]):
+                self.cross()
+            if(self.willTurn==1):
+                if(self.crossed==0 or self.x>mid[self.direction]['x']):
+                    if((self.x>=self.stop or green or self.crossed==1) and (ahead is None or self.x>(ahead.x + ahead.width + gap2) or ahead.turned==1)):
+                        self.x -= self.speed
+                else:
+                    if(self.turned==0):
+                        self.rotate()
+                        self.x -= 1.8
+                        self.y -= 2.5
+                        if(self.rotateAngle==90):
+                            self.turned = 1
+                    else:
+                        if(ahead is None or self.y>(ahead.y + ahead.height + gap2) or self.x>(ahead.x + gap2)):
+                            self.y -= self.speed
+            else:
+                if((self.x>=self.stop or self.crossed == 1 or green) and (ahead is None or self.x>(ahead.x + ahead.width + gap2) or (ahead.turned==1))):
+                    self.x -= self.speed
+
+        elif(self.direction=='up'):
+            if(self.crossed==0 and self.y<stopLines[self.direction]):
+                self.cross()
+            if(self.willTurn==1):
+                if(self.crossed==0 or self.y>mid[self.direction]['y']):
+                    if((self.y>=self.stop or green or self.crossed == 1) and (ahead is None or self.y>(ahead.y + ahead.height + gap2) or ahead.turned==1)):
+                        self.y -= self.speed
+                else:
+                    if(self.turned==0):
+                        self.rotate()
+                        self.x += 1
+                        self.y -= 1
+                        if(self.rotateAngle==90):
+                            self.turned = 1
+                    else:
+                        if(ahead is None or self.x<(ahead.x - ahead.width - gap2) or self.y>(ahead.y + gap2)):
+                            self.x += self.speed
+            else:
+                if((self.y>=self.stop or self.crossed == 1 or green) and (ahead is None or self.y>(ahead.y + ahead.height + gap2) or (ahead.turned==1))):
+                    self.y -= self.speed
+
+
+class Engine:
+    # telemetry: optional TelemetryWriter that receives every event
+    def __init__(self, settings=None, telemetry=None):
+        self.settings = settings or Settings()
+        s = self.settings
+        self.rng = random.Random(s.seed)    # used only for vehicle draws, so seeded runs repeat exactly
+        self.events = [] if s.recordEvents else None
+        if telemetry is None and s.verbose:
+            telemetry = TelemetryWriter([StatusPrintSink()], flushOn=('status', 'detect'))
+        self.telemetry = telemetry
+        self.tracing = self.events is not None or telemetry is not None     # skip building events nobody reads
+        self.spawned = 0
+        self.tick = 0
+        self.timeElapsed = 0
+        self.finished = False
+
+        self.x = {d: list(v) for d, v in startX.items()}
+        self.y = {d: list(v) for d, v in startY.items()}
+        self.vehicles = {d: {0:[], 1:[], 2:[], 'crossed':0} for d in directionNumbers.values()}
+        self.simulation = []    # vehicles on the road, in spawn order (the sprite group in simulation.py)
+        self.retired = 0
+        # not-yet-crossed vehicles per approach and class, kept up to date on spawn and crossing
+        self.waiting = [{'car':0, 'bus':0, 'truck':0, 'rickshaw':0, 'bike':0} for i in range(noOfSignals)]
+        # the same per lane: laneWaiting[direction][lane][class]
+        self.laneWaiting = [[{'car':0, 'bus':0, 'truck':0, 'rickshaw':0, 'bike':0} for lane in range(3)] for i in range(noOfSignals)]
+        self.metrics = Metrics(s.frameRate, noOfSignals)
+
+        self.spawnTicks = s.ticks(s.spawnInterval)
+        self.clockTicks = s.ticks(clockInterval)
+        self.demand = makeDemand(s.demand)
+        if self.demand is not None:
+            self.demand.start(self)
+        self.nextSpawn = 0
+
+        self.grid = SpatialGrid() if s.conflictChecks else None
+        self.holdTicks = s.ticks(maxHold)
+        self.conflictHolds = 0      # vehicle-ticks spent giving way
+        self.profiler = None
+        self.policy = makePolicy(s.policy)
+        self.controller = PhaseController(self, noOfSignals, s.ticks(greenInterval), s.ticks(yellowInterval))
+        self.signals = self.controller.signals
+
+    # One simulated frame: signals, spawning, movement, then the elapsed-time clock
+    def step(self):
+        if self.finished:
+            return
+        self.controller.step()
+        if self.nextSpawn is not None and self.tick >= self.nextSpawn:
+            self.nextSpawn = self.spawnVehicles()
+        self.moveVehicles()
+        self.tick += 1
+        if self.tick % self.clockTicks == 0:
+            self.countSecond()
+
+    # Time every subsystem of step() with a profiler.Profiler from now on; unprofiled engines keep the plain step()
+    def attachProfiler(self, profiler):
+        self.profiler = profiler
+        self.step = self.profiledStep
+        self.mustYield = profiler.timed('conflicts', self.mustYield)
+
+    def profiledStep(self):
+        if self.finished:
+            return
+        clock = time.perf_counter
+        profiler = self.profiler
+        started = clock()
+        self.controller.step()
+        now = clock()
+        profiler.add('controller', now - started)
+        if self.nextSpawn is not None and self.tick >= self.nextSpawn:
+            started = now
+            self.nextSpawn = self.spawnVehicles()
+            now = clock()
+            profiler.add('spawn', now - started)
+        conflicts = profiler.cumulative.get('conflicts', 0.0)
+        self.moveVehicles()
+        profiler.add('move', clock() - now - (profiler.cumulative.get('conflicts', 0.0) - conflicts))    # conflicts on their own
+        self.tick += 1
+        if self.tick % self.clockTicks == 0:
+            self.countSecond()
+
+    # move() every vehicle once, track stops and retire the ones that have left the screen
+    def moveVehicles(self):
+        gone = None
+        metrics = self.metrics
+        grid = self.grid
+        for vehicle in self.simulation:
+            px, py = vehicle.x, vehicle.y
+            if grid is None:
+                vehicle.move()
+            elif not (vehicle.crossed and self.mustYield(vehicle)):
+                vehicle.move()
+                if vehicle.crossed:     # only vehicles past their stop line take part in conflict checks
+                    grid.update(vehicle)
+            if vehicle.crossed==0:
+                stopped = vehicle.x==px and vehicle.y==py
+                if stopped != vehicle.stopped:    # only transitions reach the metrics
+                    vehicle.stopped = stopped
+                    if stopped:
+                        if vehicle.firstStopTick < 0:
+                            vehicle.firstStopTick = self.tick
+                            vehicle.stops = 1
+                        elif self.tick - vehicle.resumedTick >= metrics.minRunTicks:
+                            vehicle.stops += 1
+                        metrics.stopped(vehicle.direction_number)
+                        if self.tracing:
+                            self.emit('stop', vehicle.id, vehicle.direction_number, vehicle.lane)
+                    else:
+                        vehicle.resumedTick = self.tick
+                        metrics.resumed(vehicle.direction_number)
+            elif vehicle.offScreen():
+                gone = gone or []
+                gone.append(vehicle)
+        if gone:
+            for vehicle in gone:
+                self.retireVehicle(vehicle)
+                if grid is not None:
+                    grid.remove(vehicle)
+            self.simulation = [vehicle for vehicle in self.simulation if vehicle.index >= 0]
+
+    # Right of way between a turning vehicle and the others around it, a strict order so two of them
+    # never wait for each other: straight vehicles first, then vehicles that have finished their turn,
+    # then vehicles still turning; the older vehicle first within each
+    def priority(self, vehicle):
+        if not vehicle.willTurn:
+            return (0, vehicle.id)
+        return (1 if vehicle.turned else 2, vehicle.id)
+
+    # Whether a vehicle past its stop line holds this tick. Paths are told apart by approach and lane,
+    # as a turn sweeps across the other lanes of its own approach. A vehicle at or in its turn has no
+    # single heading, so it gives way to anything with priority that its box, grown by one step,
+    # touches: vehicles of other approaches, and vehicles in the other lanes of its own approach
+    # unless they are behind it. Every other vehicle holds behind the nearest vehicle in its path that
+    # is of another approach or is turning across its lane. Only vehicles past their stop line are in
+    # the grid (the queues are outside the junction) and a vehicle's own lane is left to move(). After
+    # maxHold it goes anyway, so an unlucky geometry never parks it for good.
+    def mustYield(self, vehicle):
+        grid = self.grid
+        direction, lane = vehicle.direction, vehicle.lane
+        if vehicle.turning():
+            margin = vehicle.speed
+            rank = self.priority(vehicle)
+            conflict = any((other.direction != direction or other.lane != lane and not behind(other, vehicle))
+                           and self.priority(other) < rank
+                           for other in grid.overlapping(vehicle.x - margin, vehicle.y - margin, vehicle.width + 2*margin,
+                                                         vehicle.height + 2*margin, vehicle))
+        else:
+            dx, dy = turnHeadings[direction] if vehicle.turned else headings[direction]
+            other, distance = grid.ahead(vehicle, dx, dy, vehicle.speed + gap2,
+                                         lambda other: other.direction != direction or other.lane != lane and other.rotateAngle
+                                         and not other.turned and behind(vehicle, other))
+            conflict = other is not None
+        if not conflict:
+            vehicle.held = 0
+            return False
+        if vehicle.held >= self.holdTicks:
+            return False
+        vehicle.held += 1
+        self.conflictHolds += 1
+        return True
+
+    # One second of the elapsed-time counter (simulationTime() in simulation.py)
+    def countSecond(self):
+        self.timeElapsed += 1
+        if self.timeElapsed >= self.settings.simTime:
+            self.finished = True
+
+    # Events are plain tuples: (tick, kind, ...)
+    def emit(self, *event):
+        event = (self.tick,) + event
+        if self.events is not None:
+            self.events.append(event)
+        if self.telemetry is not None:
+            self.telemetry.publish(event)
+
+    # Digest of the event stream; two runs with the same settings and seed give the same value
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for event in self.events or ():
+            digest.update(repr(event).encode())
+        digest.update(repr(self.results()).encode())
+        return digest.hexdigest()
+
+    def run(self):
+        while not self.finished:
+            self.step()
+        self.close()
+        return self.results()
+
+    # Flush and stop the telemetry writer, if any, and let go of the demand source
+    def close(self):
+        if self.demand is not None:
+            self.demand.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+            self.tracing = self.events is not None
+
+    # Spawn just behind the last vehicle in the lane, or back at the edge once the lane has driven in
+    def resetSpawn(self, direction, lane):
+        laneVehicles = self.vehicles[direction][lane]
+        if not laneVehicles:
+            self.x[direction][lane] = startX[direction][lane]
+            self.y[direction][lane] = startY[direction][lane]
+            return
+        last = laneVehicles[-1]
+        if(direction=='right'):
+            self.x[direction][lane] = min(startX[direction][lane], last.x - last.width - gap)
+        elif(direction=='left'):
+            self.x[direction][lane] = max(startX[direction][lane], last.x + last.width + gap)
+        elif(direction=='down'):
+            self.y[direction][lane] = min(startY[direction][lane], last.y - last.height - gap)
+        elif(direction=='up'):
+            self.y[direction][lane] = max(startY[direction][lane], last.y + last.height + gap)
+
+    # Remove a crossed, off-screen vehicle and close the gap in its lane
+    def retireVehicle(self, vehicle):
+        laneVehicles = self.vehicles[vehicle.direction][vehicle.lane]
+        del laneVehicles[vehicle.index]
+        for follower in laneVehicles[vehicle.index:]:
+            follower.index -= 1
+        vehicle.index = -1
+        self.retired += 1
+
+    # Current signal phase and time left, see controller.Phase
+    def phase(self):
+        return self.controller.phase()
+
+    # Yellow started: reset stop coordinates of the approach's vehicles
+    def onYellow(self, index):
+        direction = directionNumbers[index]
+        for i in range(0,3):
+            for vehicle in self.vehicles[direction][i]:
+                vehicle.stop = defaultStop[direction]
+
+    def onGreen(self, index):
+        if self.tracing:
+            self.emit('phase', index, self.signals[index].green, self.pressure(index))
+
+    # Queue on the approach that vehicles served from this one join; they just leave the screen here
+    def downstreamQueue(self, direction_number):
+        return 0
+
+    # Not-yet-crossed vehicles on an approach by class, from the running counters
+    def waitingByClass(self, direction_number):
+        return dict(self.waiting[direction_number])
+
+    # Waiting vehicles on an approach weighted by the time each class takes to pass
+    def pressure(self, direction_number):
+        counts = self.waiting[direction_number]
+        return (counts['car']*carTime) + (counts['rickshaw']*rickshawTime) + (counts['bus']*busTime) + (counts['truck']*truckTime) + (counts['bike']*bikeTime)
+
+    # Detection decision point (setTime() in simulation.py), handed to the policy
+    def setTime(self):
+        self.policy.detect(self)
+
+    # The signal timers as a 'status' event; StatusPrintSink prints them like printStatus()
+    def printStatus(self):
+        if self.tracing:
+            controller = self.controller
+            self.emit('status', controller.currentGreen, controller.currentYellow,
+                      tuple((signal.red, signal.yellow, signal.green) for signal in self.signals))
+
+    # Same draws as generateVehicles() in simulation.py
+    def generateVehicle(self):
+        rng = self.rng
+        vehicle_type = rng.randint(0,4)
+        if(vehicle_type==4):
+            lane_number = 0
+        else:
+            lane_number = rng.randint(0,1) + 1
+        will_turn = 0
+        if(lane_number==2):
+            temp = rng.randint(0,4)
+            if(temp<=2):
+                will_turn = 1
+        temp = rng.randint(0,999)
+        a = self.settings.directionSplit
+        direction_number = 3
+        for i in range(noOfSignals):
+            if(temp<a[i]):
+                direction_number = i
+                break
+        return self.spawn(direction_number, lane_number, vehicle_type, will_turn)
+
+    # Spawn every vehicle due now; returns the tick to call again at, None once demand has run out
+    def spawnVehicles(self):
+        if self.demand is None:
+            self.generateVehicle()
+            return self.tick + self.spawnTicks
+        for direction_number, lane_number, vehicle_type, will_turn in self.demand.arrivals(self.tick):
+            self.spawn(direction_number, lane_number, vehicle_type, will_turn)
+        return self.demand.nextTick()
+
+    def spawn(self, direction_number, lane_number, vehicle_type, will_turn):
+        self.spawned += 1
+        if self.tracing:
+            self.emit('spawn', self.spawned, direction_number, lane_number, vehicle_type, will_turn)
+        return self.addVehicle(lane_number, vehicleTypes[vehicle_type], direction_number, will_turn)
+
+    def addVehicle(self, lane, vehicleClass, direction_number, will_turn):
+        return Vehicle(self, lane, vehicleClass, direction_number, directionNumbers[direction_number], will_turn)
+
+    def crossedCounts(self):
+        return [self.vehicles[directionNumbers[i]]['crossed'] for i in range(noOfSignals)]
+
+    def onRoad(self):
+        return len(self.simulation)
+
+    def results(self):
+        crossed = self.crossedCounts()
+        totalVehicles = sum(crossed)
+        return {
+            'crossed': crossed,
+            'totalVehicles': totalVehicles,
+            'timeElapsed': self.timeElapsed,
+            'ticks': self.tick,
+            'onRoad': self.onRoad(),
+            'waits': self.metrics.overall.summary(),
+            'throughput': float(totalVehicles)/float(self.timeElapsed) if self.timeElapsed else 0.0,
+        }
+
+    # End-of-run summary in the same format as simulationTime()
+    def report(self):
+        r = self.results()
+        print('Lane-wise Vehicle Counts')
+        for i in range(noOfSignals):
+            print('Lane',i+1,':',r['crossed'][i])
+        print('Total vehicles passed: ',r['totalVehicles'])
+        print('Total time passed: ',r['timeElapsed'])
+        print('No. of vehicles passed per unit time: ',r['throughput'])
+        print()
+        self.metrics.report()
+
+
+if __name__ == '__main__':
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else simTime
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    engine = Engine(Settings(simTime=length, seed=seed))
+    engine.run()
+    engine.report()
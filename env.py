@@ -0,0 +1,197 @@
+# Reinforcement-learning environment
+# Gym-style reset()/step(action) around the headless engine. The agent is the
+# signal policy: every step it picks the approach to serve, and the engine then
+# runs for stepTime simulated seconds.
+#
+# Observation (a flat list of ints, observationSize long):
+#   [0:60]   vehicles not yet across the stop line per direction, lane and class
+#            (right, down, left, up) x (lane 0, 1, 2) x (car, bus, truck, rickshaw, bike)
+#   [60:64]  current green approach, one-hot
+#   [64]     1 while yellow
+#   [65]     seconds of the current green so far (signal seconds), held through its yellow
+# Action: approach 0-3. Every green starts at defaultMinimum; the current approach
+# extends it by stepTime, up to defaultMaximum in all; any other approach ends the
+# green and is served after the yellow.
+# Reward: minus the number of vehicles stopped at the stop lines after the step.
+#
+# VectorEnv steps N environments in subprocesses:
+#   python env.py 8 2000      # 8 environments, 2000 random steps, prints samples per second
+
+import copy
+import multiprocessing
+import numbers
+import random
+import sys
+import time
+
+from engine import Engine, Settings, vehicleTypes, noOfSignals
+from policies import Policy
+
+observationSize = 4*3*len(vehicleTypes) + noOfSignals + 2
+actionCount = noOfSignals
+classIndex = {name: i for i, name in vehicleTypes.items()}
+
+def checkAction(action):
+    if isinstance(action, bool) or not isinstance(action, numbers.Integral) or not 0 <= action < actionCount:
+        raise ValueError("action must be an approach number from 0 to %d, not %r" % (actionCount - 1, action))
+
+# Serves whatever the agent asked for last
+class AgentPolicy(Policy):
+    name = 'agent'
+
+    def __init__(self):
+        self.requested = 1
+        self.greenBase = 0      # totalGreenTime of the signal being served when its green began
+
+    def choose(self, engine, current):
+        self.greenBase = engine.signals[self.requested].totalGreenTime
+        return self.requested, engine.settings.defaultMinimum
+
+    # Push the end of the running green back by `ticks`, up to defaultMaximum signal seconds of green in all
+    def extend(self, engine, ticks):
+        controller = engine.controller
+        if controller.currentYellow:
+            return
+        signal = engine.signals[controller.currentGreen]
+        seconds = -(-ticks // controller.greenTicks)
+        signal.green = max(signal.green, min(signal.green + seconds, engine.settings.defaultMaximum - self.greenElapsed(engine)))
+
+    # Signal seconds of the current green so far; totalGreenTime only counts green, so this holds through the yellow
+    def greenElapsed(self, engine):
+        return engine.signals[engine.controller.currentGreen].totalGreenTime - self.greenBase
+
+class TrafficEnv:
+    def __init__(self, settings=None, stepTime=1.0):
+        self.settings = settings or Settings()
+        self.stepTime = stepTime
+        self.engine = None
+        self.policy = None
+
+    def reset(self, seed=None):
+        settings = copy.copy(self.settings)
+        if seed is not None:
+            settings.seed = seed
+        self.policy = AgentPolicy()
+        settings.policy = self.policy
+        self.engine = Engine(settings)
+        self.stepTicks = settings.ticks(self.stepTime)
+        return self.observe()
+
+    def step(self, action):
+        checkAction(action)
+        action = int(action)
+        engine = self.engine
+        controller = engine.controller
+        self.policy.requested = action
+        if action == controller.currentGreen:
+            self.policy.extend(engine, self.stepTicks)
+        else:
+            controller.endGreen()
+        served = engine.metrics.overall.served
+        for i in range(self.stepTicks):
+            engine.step()
+            if engine.finished:
+                break
+        queue = engine.metrics.overall.queue
+        info = {'crossed': engine.metrics.overall.served - served, 'tick': engine.tick}
+        if engine.finished:
+            engine.close()
+        return self.observe(), -queue, engine.finished, info
+
+    def observe(self):
+        engine = self.engine
+        controller = engine.controller
+        counts = [0]*observationSize
+        for d in range(noOfSignals):
+            for lane in range(3):     # the engine's running counters, in the order of vehicleTypes
+                base = (d*3 + lane)*len(vehicleTypes)
+                waiting = engine.laneWaiting[d][lane]
+                for name, i in classIndex.items():
+                    counts[base + i] = waiting[name]
+        base = 4*3*len(vehicleTypes)
+        counts[base + controller.currentGreen] = 1
+        counts[base + noOfSignals] = controller.currentYellow
+        counts[base + noOfSignals + 1] = self.policy.greenElapsed(engine)
+        return counts
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.close()
+
+
+# Worker process: one environment, driven over a pipe. Episodes after the first are seeded
+# seed + stride, seed + 2*stride, ... when the first one was seeded
+def serve(conn, settings, stepTime):
+    env = TrafficEnv(settings, stepTime)
+    seed, stride = None, 1
+    while True:
+        command, arg = conn.recv()
+        if command == 'step':
+            observation, reward, done, info = env.step(arg)
+            if done:    # start the next episode straight away; the last observation goes in info
+                info['terminal'] = observation
+                if seed is not None:
+                    seed += stride
+                observation = env.reset(seed)
+            conn.send((observation, reward, done, info))
+        elif command == 'reset':
+            seed, stride = arg
+            conn.send(env.reset(seed))
+        elif command == 'close':
+            env.close()
+            conn.close()
+            return
+
+class VectorEnv:
+    # n environments in subprocesses. With a seed (given to reset() or else in the settings)
+    # episode k of environment i is seeded seed + i + k*n, so no two episodes share a seed
+    def __init__(self, n, settings=None, stepTime=1.0):
+        self.n = n
+        self.settings = settings or Settings()
+        self.connections = []
+        self.processes = []
+        for i in range(n):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=serve, args=(child, self.settings, stepTime), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.settings.seed
+        for i, conn in enumerate(self.connections):
+            conn.send(('reset', (None if seed is None else seed + i, self.n)))
+        return [conn.recv() for conn in self.connections]
+
+    # Returns lists of observations, rewards, dones and infos, one entry per environment
+    def step(self, actions):
+        for action in actions:
+            checkAction(action)     # here, as a worker that raised would leave step() waiting for it
+        for conn, action in zip(self.connections, actions):
+            conn.send(('step', action))
+        results = [conn.recv() for conn in self.connections]
+        return tuple(list(column) for column in zip(*results))
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(('close', None))
+        for process in self.processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    envs = VectorEnv(n)
+    envs.reset(seed=1)
+    rng = random.Random(0)
+    started = time.perf_counter()
+    episodes = 0
+    for i in range(steps):
+        observations, rewards, dones, infos = envs.step([rng.randrange(actionCount) for j in range(n)])
+        episodes += sum(dones)
+    elapsed = time.perf_counter() - started
+    envs.close()
+    print('%d environments, %d steps: %.0f samples/s, %d episodes finished' % (n, steps, n*steps/elapsed, episodes))
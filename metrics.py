@@ -0,0 +1,114 @@
+# Wait-time and queue statistics
+# Each vehicle carries its spawn tick, first-stop tick and stop count; when it
+# crosses the stop line those are folded into running per-approach statistics
+# and dropped, so memory stays fixed however many vehicles a run creates.
+#
+# A vehicle's wait is the time from its first stop to crossing the stop line
+# (0 if it never stopped). Queued vehicles creep forward a frame at a time, so a
+# halt only counts as a new stop after moving for at least minRun seconds.
+# Percentiles come from a fixed-width histogram.
+
+directionNumbers = {0:'right', 1:'down', 2:'left', 3:'up'}
+
+class Histogram:
+    def __init__(self, binWidth=0.5, maxValue=600):
+        self.binWidth = binWidth
+        self.bins = [0] * (int(maxValue / binWidth) + 1)    # last bin collects everything above maxValue
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.bins[min(int(value / self.binWidth), len(self.bins) - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    # Fold in another histogram with the same bins, e.g. from another intersection
+    def merge(self, other):
+        for i, n in enumerate(other.bins):
+            self.bins[i] += n
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    # Upper edge of the bin holding the q-th quantile, capped at the largest value seen
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.bins):
+            seen += n
+            if seen >= target:
+                return min((i + 1) * self.binWidth, self.max)
+        return self.max
+
+class ApproachStats:
+    def __init__(self):
+        self.waits = Histogram()
+        self.delays = Histogram()   # spawn to crossing
+        self.served = 0
+        self.stops = 0
+        self.queue = 0              # vehicles currently stopped before the stop line
+        self.maxQueue = 0
+
+    def summary(self):
+        waits = self.waits
+        return {
+            'served': self.served,
+            'meanWait': waits.mean(),
+            'p50Wait': waits.quantile(0.50),
+            'p95Wait': waits.quantile(0.95),
+            'p99Wait': waits.quantile(0.99),
+            'maxWait': waits.max,
+            'meanDelay': self.delays.mean(),
+            'stopsPerVehicle': float(self.stops) / self.served if self.served else 0.0,
+            'queue': self.queue,
+            'maxQueue': self.maxQueue,
+        }
+
+class Metrics:
+    def __init__(self, frameRate, noOfSignals=4, minRun=1.0):
+        self.frameRate = float(frameRate)
+        self.minRunTicks = int(minRun * frameRate)
+        self.approaches = [ApproachStats() for i in range(noOfSignals)]
+        self.overall = ApproachStats()
+
+    def stopped(self, direction_number, n=1):
+        for stats in (self.approaches[direction_number], self.overall):
+            stats.queue += n
+            if stats.queue > stats.maxQueue:
+                stats.maxQueue = stats.queue
+
+    def resumed(self, direction_number, n=1):
+        self.approaches[direction_number].queue -= n
+        self.overall.queue -= n
+
+    def crossed(self, direction_number, spawnTick, firstStopTick, stops, tick, isStopped=False):
+        if isStopped:
+            self.resumed(direction_number)
+        wait = (tick - firstStopTick) / self.frameRate if firstStopTick >= 0 else 0.0
+        delay = (tick - spawnTick) / self.frameRate
+        for stats in (self.approaches[direction_number], self.overall):
+            stats.waits.add(wait)
+            stats.delays.add(delay)
+            stats.served += 1
+            stats.stops += stops
+
+    # Live query: statistics per approach name plus 'all'
+    def summary(self):
+        result = {directionNumbers[i]: stats.summary() for i, stats in enumerate(self.approaches)}
+        result['all'] = self.overall.summary()
+        return result
+
+    def report(self):
+        print('Approach   served  mean wait  p50   p95   p99   max queue  stops/veh')
+        for name, s in self.summary().items():
+            print('%-8s %8d %10.1f %5.1f %5.1f %5.1f %11d %10.2f' % (name, s['served'], s['meanWait'], s['p50Wait'],
+                  s['p95Wait'], s['p99Wait'], s['maxQueue'], s['stopsPerVehicle']))
@@ -0,0 +1,319 @@
+# Network of signalized intersections
+# A rows x cols grid (a corridor is 1 x n) of junctions, each one the usual
+# 4-way intersection with its own signals and lanes (an Engine). A vehicle that
+# crosses and leaves a junction's screen does not disappear: it travels along
+# the link to the next junction in the direction it left and enters that
+# junction's approach. Vehicles leaving the edge of the grid exit the network,
+# and new vehicles only arrive on approaches at the edge of the grid.
+#
+# Every vehicle keeps the tick and direction it entered the network with and
+# the stops it made on the way, so leaving the grid completes a trip with a
+# travel time. A junction can be given a fixed signal plan (green time per
+# approach and an offset into the cycle) to coordinate a corridor.
+#
+# Links take linkTime seconds to travel. Because nothing can reach another
+# junction sooner than that, the grid can be split into bands of rows that run
+# linkTime ahead independently in separate processes and swap the vehicles in
+# transit between windows. The results do not depend on how the grid is split.
+#
+#   python network.py 1 5             # 5-junction corridor
+#   python network.py 20 20 300 4     # 20x20 grid, 300 seconds, 4 processes
+
+import copy
+import heapq
+import multiprocessing
+import sys
+
+from engine import Engine, Settings, noOfSignals, screenWidth, screenHeight
+from metrics import Histogram
+
+# (row, col) step of a vehicle travelling right, down, left, up
+heading = {0:(0,1), 1:(1,0), 2:(0,-1), 3:(-1,0)}
+
+# Direction a vehicle is travelling in when it leaves the screen
+def exitDirection(vehicle):
+    if vehicle.x > screenWidth:
+        return 0
+    if vehicle.y > screenHeight:
+        return 1
+    if vehicle.x + vehicle.width < 0:
+        return 2
+    return 3
+
+class Junction(Engine):
+    # sources: approaches fed from outside the network rather than by an upstream link
+    # plan: optional (greens, offset): green time of each approach and ticks into the cycle at tick 0
+    def __init__(self, row, col, settings, sources, plan=None):
+        self.row = row
+        self.col = col
+        self.sources = sources
+        self.plan = plan
+        settings = copy.copy(settings)
+        if settings.seed is not None:
+            settings.seed = settings.seed*1000003 + row*10007 + col
+        settings.directionSplit = sourceSplit(settings.directionSplit, sources)
+        if not isinstance(settings.policy, str):
+            settings.policy = copy.copy(settings.policy)    # policies keep per-junction state
+        Engine.__init__(self, settings)
+        self.entered = 0        # vehicles that arrived over a link
+        self.downstream = [0]*noOfSignals   # queue at the next junction per direction, as of the last window
+        self.exits = []         # (tick, direction, lane, vehicleClass, trip) of vehicles that left this tick
+        if plan is not None:
+            greens, offset = plan
+            self.signals[0].green = greens[0]
+            self.signals[1].red = self.signals[0].yellow + greens[0]     # as initialize() does, so detection still fires
+            self.controller.fastForward(offset)
+
+    # With a plan the next green comes from the plan instead of setTime()'s formula
+    def setTime(self):
+        if self.plan is None:
+            return Engine.setTime(self)
+        nextGreen = (self.controller.currentGreen+1)%noOfSignals
+        self.signals[nextGreen].green = self.plan[0][nextGreen]
+
+    # Only approaches on the edge of the network get new vehicles
+    def generateVehicle(self):
+        if self.sources:
+            return Engine.generateVehicle(self)
+
+    def addVehicle(self, lane, vehicleClass, direction_number, will_turn):
+        vehicle = Engine.addVehicle(self, lane, vehicleClass, direction_number, will_turn)
+        vehicle.trip = (self.tick, direction_number, 0)     # (start tick, entry direction, stops before this junction)
+        return vehicle
+
+    def retireVehicle(self, vehicle):
+        Engine.retireVehicle(self, vehicle)
+        start, entry, stops = vehicle.trip
+        self.exits.append((self.tick, exitDirection(vehicle), vehicle.lane, vehicle.vehicleClass, (start, entry, stops + vehicle.stops)))
+
+    def downstreamQueue(self, direction_number):
+        return self.downstream[direction_number]
+
+    # A vehicle arriving over a link; it turns with the same odds as a generated one
+    def enter(self, direction_number, lane, vehicleClass, trip):
+        will_turn = 0
+        if(lane==2 and self.rng.randint(0,4)<=2):
+            will_turn = 1
+        self.spawned += 1
+        self.entered += 1
+        vehicle = self.addVehicle(lane, vehicleClass, direction_number, will_turn)
+        vehicle.trip = trip
+        return vehicle
+
+# Cumulative direction split with the share of fed approaches spread over the source approaches
+def sourceSplit(split, sources):
+    weights = [split[i] - (split[i-1] if i else 0) for i in range(noOfSignals)]
+    weights = [weights[i] if i in sources else 0 for i in range(noOfSignals)]
+    total = sum(weights)
+    if not total:
+        return list(split)
+    result = []
+    running = 0
+    for w in weights:
+        running += w
+        result.append(running * 1000 // total)
+    return result
+
+class Partition:
+    # cells: the (row, col) junctions this partition runs; plans: optional (row, col) -> Junction plan
+    def __init__(self, rows, cols, cells, settings, linkTime=2.0, plans=None):
+        self.rows = rows
+        self.cols = cols
+        self.linkTicks = settings.ticks(linkTime)
+        self.junctions = {}
+        for row, col in cells:
+            sources = [d for d, (dr, dc) in heading.items() if not self.inGrid(row-dr, col-dc)]
+            self.junctions[(row, col)] = Junction(row, col, settings, sources, (plans or {}).get((row, col)))
+        self.order = sorted(self.junctions)
+        self.pending = []       # heap of transfers (tick, fromRow, fromCol, n, row, col, direction, lane, vehicleClass, trip)
+        self.tick = 0
+        self.exited = 0         # vehicles that left the edge of the grid
+        self.transferred = 0
+        self.travelTicks = 0    # summed over finished trips
+        self.tripStops = 0
+        # finished trips that left in the direction they entered, by direction
+        self.through = [0]*noOfSignals
+        self.throughTicks = [0]*noOfSignals
+        self.throughStops = [0]*noOfSignals
+
+    def inGrid(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    def finished(self):
+        return all(junction.finished for junction in self.junctions.values())
+
+    # Queue per approach of every junction here, for the neighbours' downstreamQueue()
+    def queues(self):
+        return {key: [stats.queue for stats in junction.metrics.approaches] for key, junction in self.junctions.items()}
+
+    # Step every junction up to (not including) tick `until`; inbound transfers must be due at or after this window.
+    # queues: the queues of junctions in other partitions at the start of the window
+    def runWindow(self, until, inbound=(), queues=None):
+        for transfer in inbound:
+            heapq.heappush(self.pending, transfer)
+        queues = dict(queues or {})
+        queues.update(self.queues())
+        for (row, col), junction in self.junctions.items():
+            for d, (dr, dc) in heading.items():
+                neighbour = queues.get((row+dr, col+dc))
+                junction.downstream[d] = neighbour[d] if neighbour else 0
+        outbound = []
+        junctions = self.junctions
+        while self.tick < until:
+            tick = self.tick
+            while self.pending and self.pending[0][0] <= tick:
+                transfer = heapq.heappop(self.pending)
+                junctions[(transfer[4], transfer[5])].enter(*transfer[6:])
+            for key in self.order:
+                junction = junctions[key]
+                junction.step()
+                if junction.exits:
+                    for n, (exitTick, direction, lane, vehicleClass, trip) in enumerate(junction.exits):
+                        dr, dc = heading[direction]
+                        row, col = key[0]+dr, key[1]+dc
+                        if not self.inGrid(row, col):
+                            self.finishTrip(exitTick, direction, trip)
+                            continue
+                        self.transferred += 1
+                        transfer = (exitTick + self.linkTicks, key[0], key[1], n, row, col, direction, lane, vehicleClass, trip)
+                        if (row, col) in junctions:
+                            heapq.heappush(self.pending, transfer)
+                        else:
+                            outbound.append(transfer)
+                    junction.exits = []
+            self.tick += 1
+        return outbound
+
+    def finishTrip(self, tick, direction, trip):
+        start, entry, stops = trip
+        self.exited += 1
+        self.travelTicks += tick - start
+        self.tripStops += stops
+        if direction == entry:
+            self.through[direction] += 1
+            self.throughTicks[direction] += tick - start
+            self.throughStops[direction] += stops
+
+    def results(self):
+        crossed = 0
+        generated = entered = onRoad = 0
+        waits = {}
+        for key, junction in self.junctions.items():
+            junction.close()
+            crossed += sum(junction.crossedCounts())
+            generated += junction.spawned - junction.entered
+            entered += junction.entered
+            onRoad += junction.onRoad()
+            waits[key] = junction.metrics.overall.waits
+        return {'junctions': len(self.junctions), 'ticks': self.tick, 'generated': generated, 'entered': entered,
+                'crossed': crossed, 'exited': self.exited, 'transferred': self.transferred,
+                'onRoad': onRoad, 'inTransit': len(self.pending), 'waits': waits,
+                'travelTicks': self.travelTicks, 'tripStops': self.tripStops,
+                'through': self.through, 'throughTicks': self.throughTicks, 'throughStops': self.throughStops}
+
+# Run the whole grid in this process
+def runNetwork(rows, cols, settings=None, linkTime=2.0, plans=None):
+    settings = settings or Settings()
+    cells = [(row, col) for row in range(rows) for col in range(cols)]
+    partition = Partition(rows, cols, cells, settings, linkTime, plans)
+    while not partition.finished():
+        partition.runWindow(partition.tick + partition.linkTicks)
+    return summarize([partition.results()], settings.frameRate)
+
+# Worker process: run windows on request and send back what leaves the partition
+def serve(conn, rows, cols, cells, settings, linkTime, plans):
+    partition = Partition(rows, cols, cells, settings, linkTime, plans)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        until, inbound, queues = request
+        conn.send((partition.runWindow(until, inbound, queues), partition.finished(), partition.queues()))
+    conn.send(partition.results())
+    conn.close()
+
+# Split the grid into bands of rows, one process each, and swap vehicles in transit every linkTime
+def runPartitioned(rows, cols, workers, settings=None, linkTime=2.0, plans=None):
+    settings = settings or Settings()
+    workers = max(1, min(workers, rows))
+    bands = [range(rows*i//workers, rows*(i+1)//workers) for i in range(workers)]
+    owner = {}
+    connections = []
+    processes = []
+    for i, band in enumerate(bands):
+        cells = [(row, col) for row in band for col in range(cols)]
+        for cell in cells:
+            owner[cell] = i
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=serve, args=(child, rows, cols, cells, settings, linkTime, plans), daemon=True)
+        process.start()
+        connections.append(parent)
+        processes.append(process)
+    linkTicks = settings.ticks(linkTime)
+    tick = 0
+    inbound = [[] for i in bands]
+    queues = {}
+    finished = False
+    while not finished:
+        tick += linkTicks
+        for i, conn in enumerate(connections):
+            conn.send((tick, inbound[i], queues))
+        inbound = [[] for i in bands]
+        queues = {}
+        finished = True
+        for conn in connections:
+            outbound, done, partQueues = conn.recv()
+            for transfer in outbound:
+                inbound[owner[(transfer[4], transfer[5])]].append(transfer)
+            queues.update(partQueues)
+            finished = finished and done
+    results = []
+    for conn in connections:
+        conn.send(None)
+        results.append(conn.recv())
+    for process in processes:
+        process.join()
+    return summarize(results, settings.frameRate, inTransit=sum(len(transfers) for transfers in inbound))
+
+def summarize(parts, frameRate, inTransit=0):
+    total = {}
+    waits = {}
+    for part in parts:
+        for name, value in part.items():
+            if name == 'waits':
+                waits.update(value)
+            elif name == 'ticks':
+                total[name] = max(total.get(name, 0), value)
+            elif isinstance(value, list):
+                total[name] = [a + b for a, b in zip(total.get(name, [0]*len(value)), value)]
+            else:
+                total[name] = total.get(name, 0) + value
+    total['inTransit'] += inTransit
+    merged = Histogram()
+    for key in sorted(waits):   # same order however the grid was split, so the float sums match too
+        merged.merge(waits[key])
+    waits = merged
+    total['meanWait'] = waits.mean()
+    total['p95Wait'] = waits.quantile(0.95)
+    total['meanTravelTime'] = total.pop('travelTicks') / float(frameRate) / total['exited'] if total['exited'] else 0.0
+    total['stopsPerTrip'] = float(total.pop('tripStops')) / total['exited'] if total['exited'] else 0.0
+    # per direction (right, down, left, up); on a corridor right and left are the trips along it
+    through = total['through']
+    total['throughTravelTime'] = [ticks / float(frameRate) / n if n else 0.0 for ticks, n in zip(total.pop('throughTicks'), through)]
+    total['throughStops'] = [float(stops) / n if n else 0.0 for stops, n in zip(total['throughStops'], through)]
+    return total
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("usage: python network.py rows cols [simTime] [processes]")
+        sys.exit(1)
+    rows, cols = int(sys.argv[1]), int(sys.argv[2])
+    settings = Settings(simTime=int(sys.argv[3]) if len(sys.argv) > 3 else 300, seed=1)
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    if workers > 1:
+        results = runPartitioned(rows, cols, workers, settings)
+    else:
+        results = runNetwork(rows, cols, settings)
+    for name, value in results.items():
+        print(name, ':', value)
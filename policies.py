@@ -0,0 +1,264 @@
+# Signal control policies
+# The engine asks its policy at two decision points of every cycle:
+#   detect(engine)          the next signal's red reached detectionTime (setTime() in simulation.py)
+#   choose(engine, current) the current yellow ended; returns (next green index, green time or None)
+# Returning None as the green time keeps whatever detect() set on that signal.
+# Policies with realTime = True are also called every tick with tick(engine),
+# and may lengthen the running green or end it early (controller.endGreen()).
+# They read counters the engine keeps up to date anyway (metrics queue and
+# served counts), so a tick costs a few lookups.
+#
+# Built-in policies, one per simulator variant in this repo:
+#   fixed     simulation.py: round-robin, formula computed and then overridden with 30
+#   pressure  test.py: highest weighted pressure next, green time from that pressure
+#   waiting   test1.py: most waiting vehicles next (clockwise tie-break), green time from their classes
+#   maxpressure   real-time: serve the approach with the largest queue minus downstream queue
+#   actuated      real-time: minimum green, extended while vehicles keep crossing, gap-out after a long headway
+#
+# Settings(policy=...) takes one of these names or a policy instance.
+#
+#   python policies.py 300 3      # benchmark every policy on seeds 1..3
+
+import math
+import sys
+import time
+
+noOfSignals = 4
+noOfLanes = 2
+
+class Policy:
+    name = 'policy'
+    realTime = False
+
+    def tick(self, engine):
+        pass
+
+    def detect(self, engine):
+        pass
+
+    def choose(self, engine, current):
+        return (current+1)%noOfSignals, None
+
+class FixedPolicy(Policy):
+    name = 'fixed'
+
+    def __init__(self, greenTime=30):
+        self.greenTime = greenTime
+
+    def detect(self, engine):
+        controller = engine.controller
+        greenTime = math.ceil(engine.pressure(controller.nextGreen)/(noOfLanes+1))
+        if engine.tracing:
+            engine.emit('detect', controller.nextGreen, greenTime, self.greenTime)
+        engine.signals[(controller.currentGreen+1)%noOfSignals].green = self.greenTime
+
+# choose_next_signal() and green_time_from_pressure() from test.py
+class PressurePolicy(Policy):
+    name = 'pressure'
+
+    def __init__(self, lanes=2):
+        self.lanes = lanes
+
+    def choose(self, engine, current):
+        best, bestPressure, bestRed = None, -1.0, -1
+        for i in range(noOfSignals):
+            if i == current:
+                continue
+            pressure = engine.pressure(i)
+            red = engine.signals[i].red
+            if pressure > bestPressure or (pressure == bestPressure and red > bestRed):
+                best, bestPressure, bestRed = i, pressure, red
+        if best is None:
+            best = (current+1)%noOfSignals
+        s = engine.settings
+        if bestPressure <= 0:
+            green = s.defaultMinimum
+        else:
+            green = max(s.defaultMinimum, min(s.defaultMaximum, math.ceil(bestPressure/(self.lanes+1))))
+        if engine.tracing:
+            engine.emit('detect', best, green, green)
+        return best, green
+
+# choose_next_green_index() and estimate_green_time() from test1.py. As setTime() there, the
+# choice is made at detection, on the queues of that moment, and taken when the yellow ends;
+# a green too short to reach detection is decided at the end of the yellow, as test1.py does.
+# Detection is the engine's decision point for every policy (the next signal's red at
+# detectionTime), which comes as the green ends rather than with detectionTime of green left
+class WaitingPolicy(Policy):
+    name = 'waiting'
+
+    def __init__(self):
+        self.prepared = None    # (next green, green time) decided at detection
+
+    def detect(self, engine):
+        self.prepared = self.decide(engine, engine.controller.currentGreen)
+
+    def choose(self, engine, current):
+        prepared, self.prepared = self.prepared, None
+        return prepared if prepared is not None else self.decide(engine, current)
+
+    def decide(self, engine, current):
+        counts = [sum(engine.waitingByClass(i).values()) if i != current else -1 for i in range(noOfSignals)]
+        best = (current+1)%noOfSignals      # nobody waiting: round-robin to keep things moving
+        if max(counts) > 0:
+            for step in range(1, noOfSignals):  # tie-break clockwise from current
+                i = (current+step)%noOfSignals
+                if counts[i] == max(counts):
+                    best = i
+                    break
+        s = engine.settings
+        green = max(s.defaultMinimum, min(s.defaultMaximum, math.ceil(engine.pressure(best)/(noOfLanes+1))))
+        if engine.tracing:
+            engine.emit('detect', best, green, green)
+        return best, green
+
+# Max-pressure: pressure of an approach is its queue at the stop line minus the queue it feeds
+# downstream (0 for an isolated intersection). The green goes to the highest pressure, and is
+# cut short after the minimum once another approach beats it by `margin` vehicles.
+class MaxPressurePolicy(Policy):
+    name = 'maxpressure'
+    realTime = True
+
+    def __init__(self, margin=2):
+        self.margin = margin
+        self.greenStart = 0
+
+    def pressure(self, engine, i):
+        return engine.metrics.approaches[i].queue - engine.downstreamQueue(i)
+
+    def choose(self, engine, current):
+        best, bestPressure, bestRed = (current+1)%noOfSignals, None, -1
+        for i in range(noOfSignals):
+            pressure = self.pressure(engine, i)
+            red = engine.signals[i].red if i != current else -1
+            if bestPressure is None or pressure > bestPressure or (pressure == bestPressure and red > bestRed):
+                best, bestPressure, bestRed = i, pressure, red
+        self.greenStart = engine.tick
+        if engine.tracing:
+            engine.emit('detect', best, bestPressure, engine.settings.defaultMaximum)
+        return best, engine.settings.defaultMaximum
+
+    def tick(self, engine):
+        controller = engine.controller
+        if controller.currentYellow or engine.tick - self.greenStart < engine.settings.defaultMinimum*controller.greenTicks:
+            return
+        current = controller.currentGreen
+        served = self.pressure(engine, current)
+        for i in range(noOfSignals):
+            if i != current and self.pressure(engine, i) >= served + self.margin:
+                controller.endGreen()
+                return
+
+# Actuated: every green starts at the minimum. Each vehicle crossing the stop line on green
+# extends it to at least `passage` seconds, up to the maximum, so the green gaps out once the
+# headway between crossings exceeds `passage`. Approaches are served in turn.
+class ActuatedPolicy(Policy):
+    name = 'actuated'
+    realTime = True
+
+    def __init__(self, passage=2):
+        self.passage = passage
+        self.greenStart = 0
+        self.served = None
+
+    def choose(self, engine, current):
+        best = (current+1)%noOfSignals
+        self.greenStart = engine.tick
+        self.served = engine.metrics.approaches[best].served
+        return best, engine.settings.defaultMinimum
+
+    def tick(self, engine):
+        controller = engine.controller
+        if controller.currentYellow:
+            return
+        current = controller.currentGreen
+        served = engine.metrics.approaches[current].served
+        if self.served is None:
+            self.served = served
+        if served == self.served:
+            return
+        self.served = served
+        s = engine.settings
+        signal = engine.signals[current]
+        elapsed = (engine.tick - self.greenStart) // controller.greenTicks     # signal seconds of green so far
+        if signal.green < self.passage and elapsed + self.passage <= s.defaultMaximum:
+            signal.green = self.passage
+
+builtins = {policy.name: policy for policy in (FixedPolicy, PressurePolicy, WaitingPolicy, MaxPressurePolicy, ActuatedPolicy)}
+
+def makePolicy(policy):
+    if not isinstance(policy, str):
+        return policy
+    if policy not in builtins:
+        raise ValueError("unknown policy %r, expected one of %s" % (policy, ', '.join(sorted(builtins))))
+    return builtins[policy]()
+
+# Wraps a policy and times every decision it makes
+class TimedPolicy(Policy):
+    def __init__(self, policy):
+        self.policy = policy
+        self.name = policy.name
+        self.realTime = policy.realTime
+        self.times = []         # seconds per decision
+        self.tickTime = 0.0     # total and worst seconds spent in tick()
+        self.tickMax = 0.0
+
+    def detect(self, engine):
+        started = time.perf_counter()
+        self.policy.detect(engine)
+        self.times.append(time.perf_counter() - started)
+
+    def tick(self, engine):
+        started = time.perf_counter()
+        self.policy.tick(engine)
+        elapsed = time.perf_counter() - started
+        self.tickTime += elapsed
+        if elapsed > self.tickMax:
+            self.tickMax = elapsed
+
+    def choose(self, engine, current):
+        started = time.perf_counter()
+        decision = self.policy.choose(engine, current)
+        self.times.append(time.perf_counter() - started)
+        return decision
+
+# Run every policy on the same seeded demand; one row per policy, averaged over the seeds
+def benchmark(names=None, seeds=(1, 2, 3), simTime=300):
+    from engine import Engine, Settings     # engine imports this module
+    rows = []
+    for name in names or sorted(builtins):
+        crossed = delay = wait = tickTime = 0.0
+        ticks = 0
+        times = []
+        for seed in seeds:
+            policy = TimedPolicy(makePolicy(name))
+            engine = Engine(Settings(simTime=simTime, seed=seed, policy=policy))
+            results = engine.run()
+            overall = engine.metrics.overall.summary()
+            crossed += results['totalVehicles']
+            delay += overall['meanDelay']
+            wait += overall['meanWait']
+            times += policy.times
+            tickTime += policy.tickTime
+            ticks += results['ticks']
+        times.sort()
+        rows.append({
+            'policy': name,
+            'throughput': crossed / len(seeds) / simTime,
+            'meanDelay': delay / len(seeds),
+            'meanWait': wait / len(seeds),
+            'decisions': len(times),
+            'meanDecisionUs': 1e6 * sum(times) / len(times) if times else 0.0,
+            'maxDecisionUs': 1e6 * times[-1] if times else 0.0,
+            'meanTickUs': 1e6 * tickTime / ticks,      # real-time policies only
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    simTime = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seeds = range(1, 1 + (int(sys.argv[2]) if len(sys.argv) > 2 else 3))
+    print('policy       veh/s  mean delay  mean wait  decisions  mean us  max us  us/tick')
+    for row in benchmark(seeds=seeds, simTime=simTime):
+        print('%-11s %6.3f %11.1f %10.1f %10d %8.1f %7.1f %8.2f' % (row['policy'], row['throughput'], row['meanDelay'],
+              row['meanWait'], row['decisions'], row['meanDecisionUs'], row['maxDecisionUs'], row['meanTickUs']))
@@ -0,0 +1,117 @@
+# Hot-path profiling
+# Accumulates wall time per subsystem (spawn, move, conflict checks, controller,
+# snapshot, text rendering, blit, display update, detection) and reports it per
+# frame: mean and worst milliseconds of each section in a frame and its share of
+# all the profiled time. A frame is one engine tick headless, one display frame in
+# simulation.py (then the engine sections add up every tick run during it).
+#
+# Nothing is timed unless a profiler is attached: Engine.attachProfiler() swaps
+# in a timed step(), and the renderer only checks `profiler is None` once per
+# frame, so an unprofiled run does the same work as before.
+#
+# SIM_PROFILE=1 turns it on in simulation.py, with an on-screen overlay and a
+# summary printed every 10 seconds. Headless:
+#   python profiler.py 300              # profile 300 seconds of the default scenario
+#   python profiler.py 300 maxpressure conflicts
+
+import sys
+import threading
+import time
+
+class Profiler:
+    # interval: seconds between printed summaries (None: never print); overlayInterval: seconds between overlay refreshes
+    def __init__(self, interval=10.0, overlayInterval=1.0, printer=print):
+        self.interval = interval
+        self.overlayInterval = overlayInterval
+        self.printer = printer
+        self.lock = threading.Lock()    # the engine thread and the display thread both add sections
+        self.frame = {}                 # name -> seconds in the frame so far
+        self.cumulative = {}            # name -> seconds since the start, never reset
+        self.period = Window()          # frames since the last printed summary
+        self.recent = Window()          # frames since the last overlay refresh
+        self.overlay = []               # rows of the last finished overlay window
+        self.total = Window()           # the whole run
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.frame[name] = self.frame.get(name, 0.0) + seconds
+            self.cumulative[name] = self.cumulative.get(name, 0.0) + seconds
+
+    # function, timed under `name` on every call
+    def timed(self, name, function):
+        clock = time.perf_counter
+        add = self.add
+        def call(*args, **kwargs):
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add(name, clock() - started)
+        return call
+
+    def endFrame(self):
+        with self.lock:
+            frame, self.frame = self.frame, {}
+        now = time.perf_counter()
+        for window in (self.period, self.recent, self.total):
+            window.add(frame, now)
+        if now - self.recent.started >= self.overlayInterval:
+            self.overlay = self.recent.rows()
+            self.recent = Window(now)
+        if self.interval is not None and now - self.period.started >= self.interval:
+            if self.printer is not None:
+                self.printer(self.format(self.period.rows()))
+            self.period = Window(now)
+
+    # Summary table of rows from Window.rows()
+    def format(self, rows):
+        lines = ['section        ms/frame   max ms   share']
+        for name, mean, worst, share in rows:
+            lines.append('%-12s %10.3f %8.3f %6.1f%%' % (name, mean, worst, 100*share))
+        return '\n'.join(lines)
+
+    # Lines for the on-screen overlay
+    def lines(self):
+        return ['%-10s %6.2f ms' % (name, mean) for name, mean, worst, share in self.overlay]
+
+# Per-section totals and worst frame over a run of frames
+class Window:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.frames = 0
+        self.totals = {}
+        self.worst = {}
+
+    def add(self, frame, now):
+        self.frames += 1
+        for name, seconds in frame.items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            if seconds > self.worst.get(name, 0.0):
+                self.worst[name] = seconds
+
+    # (name, mean ms per frame, worst ms in a frame, share of the profiled time), largest first
+    def rows(self):
+        if not self.frames:
+            return []
+        total = sum(self.totals.values()) or 1.0
+        rows = [(name, 1e3*seconds/self.frames, 1e3*self.worst[name], seconds/total) for name, seconds in self.totals.items()]
+        rows.sort(key=lambda row: -row[1])
+        return rows
+
+
+if __name__ == '__main__':
+    from engine import Engine, Settings
+    simTime = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    policy = sys.argv[2] if len(sys.argv) > 2 else 'fixed'
+    conflictChecks = 'conflicts' in sys.argv[3:]
+    engine = Engine(Settings(simTime=simTime, seed=1, policy=policy, conflictChecks=conflictChecks))
+    profiler = Profiler(interval=None)
+    engine.attachProfiler(profiler)
+    started = time.perf_counter()
+    while not engine.finished:
+        engine.step()
+        profiler.endFrame()
+    elapsed = time.perf_counter() - started
+    engine.close()
+    print('%d ticks in %.2f s, %.1f us per tick' % (engine.tick, elapsed, 1e6*elapsed/engine.tick))
+    print(profiler.format(profiler.total.rows()))
@@ -0,0 +1,117 @@
+# Dirty-rectangle renderer
+# Instead of blitting the whole background and flipping the whole screen every
+# frame, only the regions that changed are repainted: where a vehicle was and
+# now is, and signal widgets whose image or text changed. Everything else on
+# the screen is left as it was drawn the frame before.
+#
+# Text is rendered once per (text, colours) and reused, so the timer values,
+# "STOP", "SLOW", "GO" and "---" are never passed to font.render twice. Because
+# cached surfaces are shared, a widget has changed exactly when its surface
+# object is a different one.
+#
+# With a profiler.Profiler, font.render, the blits and the display update are
+# timed as 'text', 'blit' and 'display'.
+
+import time
+
+import pygame
+
+class Renderer:
+    def __init__(self, screen, background, font, maxGlyphs=512, profiler=None):
+        self.screen = screen
+        self.background = background
+        self.font = font
+        self.maxGlyphs = maxGlyphs
+        self.glyphs = {}        # (text, foreground, background) -> Surface
+        self.widgets = {}       # key -> (Surface, Rect) drawn last frame
+        self.sprites = {}       # vehicle -> (Surface, Rect) drawn last frame
+        self.fullRedraw = True
+        self.profiler = profiler
+
+    def text(self, value, foreground, background):
+        key = (str(value), foreground, background)
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            if len(self.glyphs) >= self.maxGlyphs:   # counts and elapsed time keep growing
+                self.glyphs.clear()
+            started = time.perf_counter()
+            glyph = self.glyphs[key] = self.font.render(key[0], True, foreground, background)
+            if self.profiler is not None:
+                self.profiler.add('text', time.perf_counter() - started)
+        return glyph
+
+    # Repaint everything on the next frame, e.g. after the window was exposed
+    def invalidate(self):
+        self.fullRedraw = True
+
+    # widgets: [(key, Surface, position)], vehicles: [(vehicle, Surface, position)]
+    def draw(self, widgets, vehicles):
+        screen = self.screen
+        dirty = []
+
+        widgetsNow = {}
+        for key, surface, position in widgets:
+            rect = surface.get_rect(topleft=position)
+            widgetsNow[key] = (surface, rect)
+            old = self.widgets.get(key)
+            if old is None or old[0] is not surface or old[1] != rect:
+                if old is not None:
+                    dirty.append(old[1])
+                dirty.append(rect)
+        for key, (surface, rect) in self.widgets.items():
+            if key not in widgetsNow:
+                dirty.append(rect)
+
+        spritesNow = {}
+        for vehicle, surface, position in vehicles:
+            rect = surface.get_rect(topleft=(int(position[0]), int(position[1])))
+            spritesNow[vehicle] = (surface, rect)
+            old = self.sprites.get(vehicle)
+            if old is None or old[0] is not surface or old[1] != rect:
+                if old is not None:
+                    dirty.append(old[1])
+                dirty.append(rect)
+        for vehicle, (surface, rect) in self.sprites.items():
+            if vehicle not in spritesNow:   # crossed and retired
+                dirty.append(rect)
+
+        self.widgets = widgetsNow
+        self.sprites = spritesNow
+
+        profiler = self.profiler
+        started = time.perf_counter() if profiler is not None else 0.0
+        if self.fullRedraw:
+            self.fullRedraw = False
+            screen.blit(self.background, (0, 0))
+            for surface, rect in widgetsNow.values():
+                screen.blit(surface, rect)
+            for surface, rect in spritesNow.values():
+                screen.blit(surface, rect)
+            self.update(None, started)
+            return
+
+        if not dirty:
+            return
+        for rect in dirty:
+            screen.blit(self.background, rect, rect)
+        # anything overlapping a repainted region lost its pixels there; draw it again in the
+        # original order (widgets, then vehicles) and grow the region by it, so whatever was on top is redrawn too
+        for layer in (widgetsNow, spritesNow):
+            for surface, rect in layer.values():
+                if rect.collidelist(dirty) != -1:
+                    screen.blit(surface, rect)
+                    dirty.append(rect)
+        self.update(dirty, started)
+
+    # Push the repainted regions (None: the whole screen) to the display
+    def update(self, dirty, started):
+        profiler = self.profiler
+        if profiler is not None:
+            now = time.perf_counter()
+            profiler.add('blit', now - started)
+        if dirty is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty)
+        if profiler is not None:
+            profiler.add('display', time.perf_counter() - now)
@@ -0,0 +1,109 @@
+# Engine thread with snapshots
+# The engine and everything it owns (signals, lanes, spawn coordinates) are
+# only ever touched by one thread. Other threads talk to it through a command
+# queue and read its state from immutable snapshots: after every step the
+# engine builds a new Snapshot and swaps the (previous, latest) pair in one
+# assignment, so a reader always gets two consistent frames and never waits
+# for the engine, and the engine never waits for a reader.
+#
+#   runner = EngineRunner(Engine(Settings(seed=1)))
+#   runner.start()
+#   previous, latest = runner.snapshots
+#   runner.send('pause')
+
+import queue
+import threading
+import time
+
+# Immutable view of the engine after a step
+class Snapshot:
+    def __init__(self, engine, publishedAt):
+        controller = engine.controller
+        self.tick = engine.tick
+        self.timeElapsed = engine.timeElapsed
+        self.finished = engine.finished
+        self.currentGreen = controller.currentGreen
+        self.currentYellow = controller.currentYellow
+        self.signals = tuple((signal.red, signal.yellow, signal.green) for signal in engine.signals)
+        self.crossed = tuple(engine.crossedCounts())
+        # (id, direction, vehicleClass, rotateAngle, x, y) per vehicle on the road, in drawing order
+        self.vehicles = tuple((v.id, v.direction, v.vehicleClass, v.rotateAngle, v.x, v.y) for v in engine.simulation)
+        self.publishedAt = publishedAt      # time.perf_counter() when the snapshot was made
+
+class EngineRunner:
+    # speed: simulated seconds per wall-clock second
+    def __init__(self, engine, speed=1.0):
+        self.engine = engine
+        self.speed = speed
+        self.paused = False
+        self.commands = queue.Queue()
+        self.maxCatchUp = engine.settings.ticks(0.25)   # steps run at most per wake-up after a stall
+        first = Snapshot(engine, time.perf_counter())
+        self.snapshots = (first, first)     # (previous, latest); replaced, never modified
+        self.thread = threading.Thread(name="engine", target=self.loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # Queue a command for the engine thread: 'pause', 'resume', 'speed' (factor), 'call' (fn(engine)) or 'stop'
+    def send(self, command, *args):
+        self.commands.put((command, args))
+
+    def stop(self):
+        self.send('stop')
+        self.thread.join()
+
+    def stepTime(self):
+        return 1.0 / (self.engine.settings.frameRate * self.speed)
+
+    def publish(self):
+        started = time.perf_counter()
+        self.snapshots = (self.snapshots[1], Snapshot(self.engine, started))
+        if self.engine.profiler is not None:
+            self.engine.profiler.add('snapshot', time.perf_counter() - started)
+
+    # Run queued commands; returns False once told to stop
+    def handleCommands(self):
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                return True
+            if command == 'stop':
+                self.engine.close()     # flush telemetry, as when the run finishes
+                return False
+            elif command == 'pause':
+                self.paused = True
+            elif command == 'resume':
+                self.paused = False
+            elif command == 'speed':
+                self.speed = args[0]
+            elif command == 'call':
+                args[0](self.engine)
+                self.publish()
+            else:
+                raise ValueError("unknown command %r" % command)
+
+    def loop(self):
+        engine = self.engine
+        nextStep = time.perf_counter()
+        while self.handleCommands():
+            now = time.perf_counter()
+            if self.paused:
+                nextStep = now
+                time.sleep(0.05)
+                continue
+            if now < nextStep:
+                time.sleep(nextStep - now)
+                continue
+            steps = 0
+            while nextStep <= now and steps < self.maxCatchUp and not engine.finished:
+                engine.step()
+                self.publish()
+                nextStep += self.stepTime()
+                steps += 1
+            if nextStep <= now:     # too far behind: drop the backlog rather than spiral
+                nextStep = now + self.stepTime()
+            if engine.finished:
+                engine.close()
+                return
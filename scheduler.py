@@ -0,0 +1,129 @@
+# asyncio scheduler with a virtual clock
+# The activities the threads in simulation.py ran with time.sleep() - signal
+# timing (with the detection in setTime()), vehicle generation, the
+# elapsed-time counter - plus the per-frame movement run here as coroutines on
+# one event loop. They sleep on a VirtualClock counted in whole ticks, so every
+# timer fires exactly on its tick and nothing drifts.
+#
+# warp is simulated seconds per wall-clock second: 1 is real time, 10 is ten
+# times faster, None runs as fast as the CPU allows. Coroutines waking on the
+# same tick run in a fixed order (signals, spawn, movement, clock), which gives
+# the same results as Engine.run() for the same seed.
+#
+#   python scheduler.py 16 300        # 16 intersections, 300 simulated seconds, no warp limit
+#   python scheduler.py 1 60 5        # one intersection at 5x real time
+
+import asyncio
+import heapq
+import itertools
+import sys
+
+from engine import Engine, Settings
+
+# Order of activities within a tick
+SIGNALS = 0
+SPAWN = 1
+MOVE = 2
+CLOCK = 3
+
+class VirtualClock:
+    def __init__(self, frameRate=60, warp=None):
+        self.frameRate = frameRate
+        self.tick = 0
+        self.waiters = []               # heap of (tick, priority, sequence, future)
+        self.sequence = itertools.count()
+        self.warp = warp
+        self.anchor = None              # (loop time, tick) that wall-clock deadlines are measured from
+
+    def time(self):
+        return self.tick / float(self.frameRate)
+
+    def setWarp(self, warp):
+        self.warp = warp
+        self.anchor = None
+
+    # Future that completes when the clock reaches `tick`
+    def wait(self, tick, priority=0):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (max(tick, self.tick), priority, next(self.sequence), future))
+        return future
+
+    async def sleep(self, seconds, priority=0):
+        await self.wait(self.tick + int(round(seconds * self.frameRate)), priority)
+
+    # Wake waiters in (tick, priority) order until nobody is waiting
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while self.waiters:
+            tick, priority, sequence, future = heapq.heappop(self.waiters)
+            if future.cancelled():
+                continue
+            if tick > self.tick and self.warp:
+                if self.anchor is None:
+                    self.anchor = (loop.time(), self.tick)
+                # deadlines come from the anchor, not from the previous wake-up, so late wake-ups do not add up
+                deadline = self.anchor[0] + (tick - self.anchor[1]) / (self.frameRate * float(self.warp))
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.tick = tick
+            future.set_result(None)
+            await asyncio.sleep(0)      # let the woken coroutine run up to its next wait first
+
+
+# Real-time policies (policies.py) look at the junction every tick and can end a green early,
+# so with one of them this wakes every tick instead of only when the timers are due
+async def signals(engine, clock):
+    controller = engine.controller
+    while not engine.finished:
+        controller.step()               # setTime() runs inline here, not on a detection thread
+        await clock.wait(engine.tick + 1 if engine.policy.realTime else controller.nextTick, SIGNALS)
+
+async def spawner(engine, clock):
+    while not engine.finished:
+        nextSpawn = engine.spawnVehicles()
+        if nextSpawn is None:
+            return
+        await clock.wait(nextSpawn, SPAWN)
+
+async def movement(engine, clock):
+    while not engine.finished:
+        engine.moveVehicles()
+        engine.tick += 1
+        await clock.wait(engine.tick, MOVE)
+
+async def elapsedTime(engine, clock):
+    await clock.wait(engine.clockTicks - 1, CLOCK)
+    while True:
+        engine.countSecond()
+        if engine.finished:
+            return
+        await clock.wait(engine.tick + engine.clockTicks - 1, CLOCK)
+
+# Run engines (all with the same frameRate) to the end on one event loop; returns their results
+async def runEngines(engines, clock=None):
+    clock = clock or VirtualClock(engines[0].settings.frameRate)
+    tasks = []
+    for engine in engines:
+        for activity in (signals, spawner, movement, elapsedTime):
+            tasks.append(asyncio.ensure_future(activity(engine, clock)))
+    await asyncio.sleep(0)     # let every activity run its tick-0 step and start waiting
+    await clock.run()
+    await asyncio.gather(*tasks)
+    results = []
+    for engine in engines:
+        engine.close()
+        results.append(engine.results())
+    return results
+
+def run(engines, warp=None):
+    return asyncio.run(runEngines(engines, VirtualClock(engines[0].settings.frameRate, warp)))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    warp = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    engines = [Engine(Settings(simTime=length, seed=i)) for i in range(count)]
+    for i, results in enumerate(run(engines, warp)):
+        print('Intersection', i+1, 'crossed', results['crossed'], 'total', results['totalVehicles'])
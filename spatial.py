@@ -0,0 +1,95 @@
+# Uniform-grid spatial index over vehicle bounding boxes
+# The screen is cut into square cells; each vehicle is listed in every cell its
+# box touches. A box query only looks at the vehicles in the cells it covers,
+# so checking every vehicle against its surroundings is about O(n) per tick
+# instead of comparing all pairs.
+#
+# Items need x, y, width and height (top-left corner and size, as drawn).
+
+class SpatialGrid:
+    def __init__(self, cellSize=64):
+        self.cellSize = cellSize
+        self.cells = {}     # (cx, cy) -> set of items
+        self.where = {}     # item -> cells it is listed in
+
+    def cellRange(self, x, y, w, h):
+        size = self.cellSize
+        return (int(x // size), int(y // size), int((x + w) // size), int((y + h) // size))
+
+    def clear(self):
+        self.cells.clear()
+        self.where.clear()
+
+    def insert(self, item):
+        x0, y0, x1, y1 = self.cellRange(item.x, item.y, item.width, item.height)
+        keys = [(cx, cy) for cx in range(x0, x1+1) for cy in range(y0, y1+1)]
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket is None:
+                bucket = self.cells[key] = set()
+            bucket.add(item)
+        self.where[item] = keys
+
+    def remove(self, item):
+        for key in self.where.pop(item, ()):
+            bucket = self.cells[key]
+            bucket.discard(item)
+            if not bucket:
+                del self.cells[key]
+
+    # Re-list an item after it moved or turned; cheap when it stayed in the same cells
+    def update(self, item):
+        keys = self.where.get(item)
+        if keys is not None:
+            x0, y0, x1, y1 = self.cellRange(item.x, item.y, item.width, item.height)
+            if keys[0] == (x0, y0) and keys[-1] == (x1, y1):
+                return
+            self.remove(item)
+        self.insert(item)
+
+    def rebuild(self, items):
+        self.clear()
+        for item in items:
+            self.insert(item)
+
+    # Items whose box overlaps the box (x, y, w, h)
+    def overlapping(self, x, y, w, h, exclude=None):
+        x0, y0, x1, y1 = self.cellRange(x, y, w, h)
+        found = set()
+        cells = self.cells
+        for cx in range(x0, x1+1):
+            for cy in range(y0, y1+1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        found.discard(exclude)
+        return [item for item in found
+                if item.x < x + w and x < item.x + item.width and item.y < y + h and y < item.y + item.height]
+
+    # Nearest item in the strip `distance` long in front of `item`, travelling (dx, dy), with the gap to it;
+    # keep(other) can rule items out
+    def ahead(self, item, dx, dy, distance, keep=None):
+        x, y, w, h = item.x, item.y, item.width, item.height
+        if dx > 0:
+            box = (x + w, y, distance, h)
+        elif dx < 0:
+            box = (x - distance, y, distance, h)
+        elif dy > 0:
+            box = (x, y + h, w, distance)
+        else:
+            box = (x, y - distance, w, distance)
+        best, bestGap = None, None
+        for other in self.overlapping(*box, exclude=item):
+            if keep is not None and not keep(other):
+                continue
+            if dx > 0:
+                gap = other.x - (x + w)
+            elif dx < 0:
+                gap = x - (other.x + other.width)
+            elif dy > 0:
+                gap = other.y - (y + h)
+            else:
+                gap = y - (other.y + other.height)
+            if bestGap is None or gap < bestGap:
+                best, bestGap = other, gap
+        return best, bestGap
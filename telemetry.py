@@ -0,0 +1,168 @@
+# Streaming telemetry
+# The engine hands events to a TelemetryWriter, which batches them and passes
+# the batches to its sinks on a background thread. publish() never blocks: if
+# the writer falls behind, whole batches are dropped and counted in `dropped`.
+#
+# Events are tuples (tick, kind, ...) with the fields listed in eventFields:
+#   spawn      vehicle, direction, lane, vehicleClass, willTurn
+#   stop       vehicle, direction, lane
+#   cross      vehicle, direction, lane, wait (seconds since first stop, 0 if none)
+#   turnStart  vehicle, direction, lane
+#   turnEnd    vehicle, direction, lane
+#   detect     direction, estimate (green time from the formula), green (time actually set)
+#   phase      green (approach index), greenTime, pressure (weighted waiting vehicles)
+#   status     green, yellow, signals ((red, yellow, green) per signal) - what printStatus() printed
+
+import collections
+import csv
+import json
+import queue
+import sys
+import threading
+import traceback
+
+directionNumbers = {0:'right', 1:'down', 2:'left', 3:'up'}
+vehicleTypes = {0:'car', 1:'bus', 2:'truck', 3:'rickshaw', 4:'bike'}
+
+eventFields = {
+    'spawn': ('vehicle', 'direction', 'lane', 'vehicleClass', 'willTurn'),
+    'stop': ('vehicle', 'direction', 'lane'),
+    'cross': ('vehicle', 'direction', 'lane', 'wait'),
+    'turnStart': ('vehicle', 'direction', 'lane'),
+    'turnEnd': ('vehicle', 'direction', 'lane'),
+    'detect': ('direction', 'estimate', 'green'),
+    'phase': ('green', 'greenTime', 'pressure'),
+    'status': ('green', 'yellow', 'signals'),
+}
+columns = ['tick', 'kind']
+for names in eventFields.values():
+    columns += [name for name in names if name not in columns]
+
+# Event tuple -> dict with readable direction and class names
+def toRecord(event):
+    record = {'tick': event[0], 'kind': event[1]}
+    record.update(zip(eventFields.get(event[1], ()), event[2:]))
+    if 'direction' in record:
+        record['direction'] = directionNumbers[record['direction']]
+    if 'vehicleClass' in record:
+        record['vehicleClass'] = vehicleTypes[record['vehicleClass']]
+    return record
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def write(self, batch):
+        self.file.write(''.join(json.dumps(toRecord(event)) + '\n' for event in batch))
+
+    def close(self):
+        self.file.close()
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=columns)
+        self.writer.writeheader()
+
+    def write(self, batch):
+        self.writer.writerows(toRecord(event) for event in batch)
+
+    def close(self):
+        self.file.close()
+
+# Keeps the last `size` events in memory, e.g. for a live view or a test
+class RingBufferSink:
+    def __init__(self, size=10000):
+        self.buffer = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def write(self, batch):
+        with self.lock:
+            self.buffer.extend(batch)
+
+    def events(self):
+        with self.lock:
+            return list(self.buffer)
+
+    def close(self):
+        pass
+
+# Prints 'status' events the way printStatus() does and 'detect' events like setTime()
+class StatusPrintSink:
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+
+    def write(self, batch):
+        out = self.out
+        for event in batch:
+            if event[1] == 'status':
+                green, yellow, signals = event[2:]
+                for i, (r, y, g) in enumerate(signals):
+                    if i == green:
+                        label = "YELLOW" if yellow else " GREEN"
+                    else:
+                        label = "   RED"
+                    print(label, "TS", i+1, "-> r:", r, " y:", y, " g:", g, file=out)
+                print(file=out)
+            elif event[1] == 'detect':
+                print('Green Time: ', event[3], file=out)
+
+    def close(self):
+        self.out.flush()
+
+
+class TelemetryWriter:
+    # flushOn: kinds of event passed on at once, with everything buffered before them, for sinks
+    # that show events as they happen (StatusPrintSink) rather than store them
+    def __init__(self, sinks, batchSize=1024, maxBatches=256, flushOn=()):
+        self.sinks = list(sinks)
+        self.batchSize = batchSize
+        self.flushOn = frozenset(flushOn)
+        self.buffer = []
+        self.queue = queue.Queue(maxsize=maxBatches)
+        self.dropped = 0        # events lost because the writer thread fell behind
+        self.errors = 0         # batches a sink failed to write
+        self.thread = threading.Thread(name="telemetry", target=self.drain, daemon=True)
+        self.thread.start()
+
+    # Called from the simulation step; only appends to a list
+    def publish(self, event):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.batchSize or event[1] in self.flushOn:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        try:
+            self.queue.put_nowait(batch)
+        except queue.Full:
+            self.dropped += len(batch)
+
+    def drain(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            for sink in self.sinks:
+                try:
+                    sink.write(batch)
+                except Exception:   # one failing sink must not stop the thread, or close() waits for it for ever
+                    self.errors += 1
+                    print("telemetry: %s failed to write %d events" % (type(sink).__name__, len(batch)), file=sys.stderr)
+                    traceback.print_exc()
+
+    # Flush what is buffered, wait for the writer thread and close the sinks
+    def close(self):
+        self.flush()
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        for sink in self.sinks:
+            sink.close()
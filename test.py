@@ -14,6 +14,8 @@ import pygame
 import sys
 import os
 
+import assets
+
 # -----------------------------
 # Configuration / Parameters
 # -----------------------------
@@ -35,6 +37,10 @@ noOfSignals = 4
 simTime = 300
 timeElapsed = 0
 
+# vehicle draws come from their own RNG; set SIM_SEED to repeat the same demand
+seed = int(os.environ['SIM_SEED']) if os.environ.get('SIM_SEED') else None
+rng = random.Random(seed)
+
 # state flags
 currentGreen = 0
 nextGreen = 1
@@ -54,6 +60,9 @@ vehicles = {
     'up':    {0:[], 1:[], 2:[], 'crossed':0}
 }
 vehicleTypes = {0:'car', 1:'bus', 2:'truck', 3:'rickshaw', 4:'bike'}
+
+# not-yet-crossed vehicles per approach and class, updated on spawn and crossing
+waiting = {d: {'car':0,'bus':0,'truck':0,'rickshaw':0,'bike':0} for d in ('right','down','left','up')}
 directionNumbers = {0:'right', 1:'down', 2:'left', 3:'up'}
 
 # signal & UI coordinates
@@ -82,16 +91,21 @@ RED=(200,0,0); YELLOW=(220,220,0); GREEN=(0,180,0); BLUE=(70,130,180)
 # -----------------------------
 # Utilities: robust image loading
 # -----------------------------
-def load_image_safe(path, fallback_size=(50,25), fill=(180,180,180)):
-    """Try to load an image; if missing, return a colored Surface of fallback_size"""
-    try:
-        img = pygame.image.load(path).convert_alpha()
-        return img
-    except Exception:
-        surf = pygame.Surface(fallback_size, pygame.SRCALPHA)
-        surf.fill(fill)
-        pygame.draw.rect(surf, (0,0,0), surf.get_rect(), 2)
-        return surf
+def fallback_surface(size, fill=(180,180,180)):
+    """A colored, outlined Surface standing in for a missing image"""
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    surf.fill(fill)
+    pygame.draw.rect(surf, (0,0,0), surf.get_rect(), 2)
+    return surf
+
+def vehicle_image(direction, vclass):
+    """Shared image of a vehicle class (assets.py), loaded once; a fallback box if the PNG is missing"""
+    if (direction, vclass) not in assets.images:
+        try:
+            assets.load(direction, vclass)
+        except (pygame.error, FileNotFoundError):
+            assets.add(direction, vclass, fallback_surface(vehicle_fallback_size(vclass)))
+    return assets.images[(direction, vclass)]
 
 def vehicle_fallback_size(vclass):
     # rough sizes (w,h)
@@ -133,12 +147,12 @@ class Vehicle(pygame.sprite.Sprite):
         self.turned = 0
         self.rotateAngle = 0
 
-        # choose vehicle image (robust)
-        vpath = f"images/{direction}/{vehicleClass}.png"
-        self.originalImage = load_image_safe(vpath, vehicle_fallback_size(vehicleClass))
-        self.currentImage = self.originalImage.copy()
+        # choose vehicle image (robust, shared between vehicles)
+        self.originalImage = vehicle_image(direction, vehicleClass)
+        self.currentImage = self.originalImage
 
         vehicles[direction][lane].append(self)
+        waiting[direction][vehicleClass] += 1
         self.index = len(vehicles[direction][lane]) - 1
 
         # stop placement
@@ -184,7 +198,7 @@ class Vehicle(pygame.sprite.Sprite):
         global currentGreen, currentYellow
         if self.direction=='right':
             if self.crossed==0 and self.x+self.currentImage.get_rect().width>stopLines[self.direction]:
-                self.crossed=1; vehicles[self.direction]['crossed']+=1
+                self.crossed=1; vehicles[self.direction]['crossed']+=1; waiting[self.direction][self.vehicleClass]-=1
             if self.willTurn==1:
                 if self.crossed==0 or self.x+self.currentImage.get_rect().width<mid[self.direction]['x']:
                     if ((self.x+self.currentImage.get_rect().width<=self.stop or (currentGreen==0 and currentYellow==0) or self.crossed==1) and
@@ -194,7 +208,7 @@ class Vehicle(pygame.sprite.Sprite):
                 else:
                     if self.turned==0:
                         self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.currentImage = assets.rotatedImage(self.direction, self.vehicleClass, self.rotateAngle)
                         self.x += 2; self.y += 1.8
                         if self.rotateAngle>=90:
                             self.turned=1
@@ -211,7 +225,7 @@ class Vehicle(pygame.sprite.Sprite):
 
         elif self.direction=='down':
             if self.crossed==0 and self.y+self.currentImage.get_rect().height>stopLines[self.direction]:
-                self.crossed=1; vehicles[self.direction]['crossed']+=1
+                self.crossed=1; vehicles[self.direction]['crossed']+=1; waiting[self.direction][self.vehicleClass]-=1
             if self.willTurn==1:
                 if self.crossed==0 or self.y+self.currentImage.get_rect().height<mid[self.direction]['y']:
                     if ((self.y+self.currentImage.get_rect().height<=self.stop or (currentGreen==1 and currentYellow==0) or self.crossed==1) and
@@ -221,7 +235,7 @@ class Vehicle(pygame.sprite.Sprite):
                 else:
                     if self.turned==0:
                         self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.currentImage = assets.rotatedImage(self.direction, self.vehicleClass, self.rotateAngle)
                         self.x -= 2.5; self.y += 2
                         if self.rotateAngle>=90:
                             self.turned=1
@@ -238,7 +252,7 @@ class Vehicle(pygame.sprite.Sprite):
 
         elif self.direction=='left':
             if self.crossed==0 and self.x<stopLines[self.direction]:
-                self.crossed=1; vehicles[self.direction]['crossed']+=1
+                self.crossed=1; vehicles[self.direction]['crossed']+=1; waiting[self.direction][self.vehicleClass]-=1
             if self.willTurn==1:
                 if self.crossed==0 or self.x>mid[self.direction]['x']:
                     if ((self.x>=self.stop or (currentGreen==2 and currentYellow==0) or self.crossed==1) and
@@ -248,7 +262,7 @@ class Vehicle(pygame.sprite.Sprite):
                 else:
                     if self.turned==0:
                         self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.currentImage = assets.rotatedImage(self.direction, self.vehicleClass, self.rotateAngle)
                         self.x -= 1.8; self.y -= 2.5
                         if self.rotateAngle>=90:
                             self.turned=1
@@ -265,7 +279,7 @@ class Vehicle(pygame.sprite.Sprite):
 
         elif self.direction=='up':
             if self.crossed==0 and self.y<stopLines[self.direction]:
-                self.crossed=1; vehicles[self.direction]['crossed']+=1
+                self.crossed=1; vehicles[self.direction]['crossed']+=1; waiting[self.direction][self.vehicleClass]-=1
             if self.willTurn==1:
                 if self.crossed==0 or self.y>mid[self.direction]['y']:
                     if ((self.y>=self.stop or (currentGreen==3 and currentYellow==0) or self.crossed==1) and
@@ -275,7 +289,7 @@ class Vehicle(pygame.sprite.Sprite):
                 else:
                     if self.turned==0:
                         self.rotateAngle += rotationAngle
-                        self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.currentImage = assets.rotatedImage(self.direction, self.vehicleClass, self.rotateAngle)
                         self.x += 1; self.y -= 1
                         if self.rotateAngle>=90:
                             self.turned=1
@@ -289,13 +303,8 @@ class Vehicle(pygame.sprite.Sprite):
 # Adaptive control helpers
 # -----------------------------
 def weighted_pressure_for(direction):
-    """Sum weighted counts of NOT-YET-CROSSED vehicles waiting on an approach."""
-    counts = {'car':0,'bus':0,'truck':0,'rickshaw':0,'bike':0}
-    # Lane 0 = bikes-only in your generator; lanes 1,2 = mixed
-    for lane in (0,1,2):
-        for v in vehicles[direction][lane]:
-            if v.crossed==0:  # still waiting upstream of the stop line
-                counts[v.vehicleClass] += 1
+    """Sum weighted counts of NOT-YET-CROSSED vehicles waiting on an approach (O(1), from `waiting`)."""
+    counts = dict(waiting[direction])
     # weighted by service time (approx how long each takes to serve)
     pressure = (counts['car']*carTime + counts['bus']*busTime + counts['truck']*truckTime +
                 counts['rickshaw']*rickshawTime + counts['bike']*bikeTime)
@@ -367,15 +376,15 @@ def updateValues():
 
 def generateVehicles():
     while True:
-        vehicle_type = random.randint(0,4)
+        vehicle_type = rng.randint(0,4)
         if vehicle_type == 4:
             lane_number = 0
         else:
-            lane_number = random.randint(0,1) + 1
+            lane_number = rng.randint(0,1) + 1
         will_turn = 0
         if lane_number == 2:
-            will_turn = 1 if random.randint(0,4) <= 2 else 0
-        temp = random.randint(0,999)
+            will_turn = 1 if rng.randint(0,4) <= 2 else 0
+        temp = rng.randint(0,999)
         a = [400,800,900,1000]
         if temp < a[0]:
             direction_number = 0
@@ -405,60 +414,71 @@ def simulationTime():
             os._exit(0)
 
 def repeat():
-    """Main phase controller: green -> yellow -> pick next by pressure -> set times -> recurse."""
+    """Main phase controller: green -> yellow -> pick next by pressure -> set times -> repeat.
+    Drives the module globals in wall-clock time for this script only; the headless engine's
+    queryable state machine is controller.PhaseController (PressurePolicy ports this choice)."""
     global currentGreen, currentYellow, nextGreen
-    while signals[currentGreen].green > 0:
-        printStatus()
-        updateValues()
-        time.sleep(0.84)
-
-    # start yellow
-    currentYellow = 1
-    vehicleCountTexts[currentGreen] = "0"
-    # reset lane stops for current approach
-    for i in range(0,3):
-        stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
-        for vehicle in vehicles[directionNumbers[currentGreen]][i]:
-            vehicle.stop = defaultStop[directionNumbers[currentGreen]]
-
-    while signals[currentGreen].yellow > 0:
-        printStatus()
-        updateValues()
-        time.sleep(0.66)
-    currentYellow = 0
-
-    # reset the just-finished approach to defaults
-    signals[currentGreen].green  = defaultGreen
-    signals[currentGreen].yellow = defaultYellow
-    signals[currentGreen].red    = defaultRed
-
-    # ---- Adaptive choice here ----
-    chosen_idx, pressure = choose_next_signal(currentGreen)
-    nextGreen = chosen_idx
-    # compute green time for the chosen approach
-    gtime = green_time_from_pressure(pressure, lanes=2)
-    signals[nextGreen].green = gtime
-
-    # set its red to the upcoming (current's) yellow+green; other reds just continue counting down
-    signals[nextGreen].red = signals[currentGreen].yellow + signals[currentGreen].green
-
-    # switch to next
-    currentGreen = nextGreen
-    # ensure some red value for the new "next of next" if you want, but not necessary for logic
-
-    # loop again
-    repeat()
+    while True:   # one signal cycle per iteration; no recursion
+        while signals[currentGreen].green > 0:
+            printStatus()
+            updateValues()
+            time.sleep(0.84)
+
+        # start yellow
+        currentYellow = 1
+        vehicleCountTexts[currentGreen] = "0"
+        # reset lane stops for current approach
+        for i in range(0,3):
+            stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
+            for vehicle in vehicles[directionNumbers[currentGreen]][i]:
+                vehicle.stop = defaultStop[directionNumbers[currentGreen]]
+
+        while signals[currentGreen].yellow > 0:
+            printStatus()
+            updateValues()
+            time.sleep(0.66)
+        currentYellow = 0
+
+        # reset the just-finished approach to defaults
+        signals[currentGreen].green  = defaultGreen
+        signals[currentGreen].yellow = defaultYellow
+        signals[currentGreen].red    = defaultRed
+
+        # ---- Adaptive choice here ----
+        chosen_idx, pressure = choose_next_signal(currentGreen)
+        nextGreen = chosen_idx
+        # compute green time for the chosen approach
+        gtime = green_time_from_pressure(pressure, lanes=2)
+        signals[nextGreen].green = gtime
+
+        # set its red to the upcoming (current's) yellow+green; other reds just continue counting down
+        signals[nextGreen].red = signals[currentGreen].yellow + signals[currentGreen].green
+
+        # switch to next
+        currentGreen = nextGreen
+        # ensure some red value for the new "next of next" if you want, but not necessary for logic
 
 # -----------------------------
 # Minimal UI (no external assets required)
 # -----------------------------
 class Main:
+    # display (before any image is loaded: convert() and convert_alpha() need it)
+    screenWidth, screenHeight = 1400, 800
+    screen = pygame.display.set_mode((screenWidth, screenHeight))
+    pygame.display.set_caption("SIMULATION (Adaptive)")
+
     # background load (safe)
     try:
         background = pygame.image.load('images/mod_int.png').convert()
     except Exception:
         background = None
 
+    # load and pre-rotate the vehicle images before the spawner starts, as simulation.py does
+    try:
+        assets.preload()
+    except (pygame.error, FileNotFoundError):
+        pass    # the rest load when first needed; a missing one gets its fallback box (vehicle_image)
+
     # start threads
     thread_time = threading.Thread(target=simulationTime, daemon=True)
     thread_time.start()
@@ -467,11 +487,6 @@ class Main:
     thread_gen = threading.Thread(target=generateVehicles, daemon=True)
     thread_gen.start()
 
-    # display
-    screenWidth, screenHeight = 1400, 800
-    screen = pygame.display.set_mode((screenWidth, screenHeight))
-    pygame.display.set_caption("SIMULATION (Adaptive)")
-
     # fonts
     font = pygame.font.Font(None, 30)
     big  = pygame.font.Font(None, 42)
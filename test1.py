@@ -7,6 +7,7 @@ import time
 import threading
 import pygame
 import sys
+import assets
 import os
 
 # ----------------------------
@@ -23,6 +24,10 @@ noOfSignals = 4
 simTime = 300
 timeElapsed = 0
 
+# Vehicle draws use a dedicated RNG; set SIM_SEED to repeat the same demand
+seed = int(os.environ['SIM_SEED']) if os.environ.get('SIM_SEED') else None
+rng = random.Random(seed)
+
 currentGreen = 0        # which signal is currently green (0: right, 1: down, 2: left, 3: up)
 nextGreen = None        # will be chosen dynamically
 currentYellow = 0
@@ -65,6 +70,14 @@ vehicles = {
 vehicleTypes = {0:'car', 1:'bus', 2:'truck', 3:'rickshaw', 4:'bike'}
 directionNumbers = {0:'right', 1:'down', 2:'left', 3:'up'}
 
+# Vehicles not yet across the stop line, per direction and class (updated on spawn and crossing)
+waiting = {
+    'right': {'car':0, 'bus':0, 'truck':0, 'rickshaw':0, 'bike':0},
+    'down' : {'car':0, 'bus':0, 'truck':0, 'rickshaw':0, 'bike':0},
+    'left' : {'car':0, 'bus':0, 'truck':0, 'rickshaw':0, 'bike':0},
+    'up'   : {'car':0, 'bus':0, 'truck':0, 'rickshaw':0, 'bike':0}
+}
+
 # Signal, timer, and count UI coordinates
 signalCoods = [(590,340),(675,260),(770,430),(675,510)]
 signalTimerCoods = [(530,210),(810,210),(810,550),(530,550)]
@@ -117,11 +130,11 @@ class Vehicle(pygame.sprite.Sprite):
         self.rotateAngle = 0
 
         vehicles[direction][lane].append(self)
+        waiting[direction][vehicleClass] += 1
         self.index = len(vehicles[direction][lane]) - 1
 
-        path = f"images/{direction}/{vehicleClass}.png"
-        self.originalImage = pygame.image.load(path)
-        self.currentImage = pygame.image.load(path)
+        self.originalImage = assets.vehicleImage(direction, vehicleClass)
+        self.currentImage = self.originalImage
 
         # Place and set individual stop position based on the car in front
         if direction == 'right':
@@ -171,6 +184,7 @@ class Vehicle(pygame.sprite.Sprite):
             if self.crossed == 0 and self.x + self.currentImage.get_rect().width > stopLines[self.direction]:
                 self.crossed = 1
                 vehicles[self.direction]['crossed'] += 1
+                waiting[self.direction][self.vehicleClass] -= 1
 
             if ((self.x + self.currentImage.get_rect().width <= self.stop or self.crossed == 1 or (currentGreen == 0 and currentYellow == 0)) and
                 (self.index == 0 or self.x + self.currentImage.get_rect().width < (vehicles[self.direction][self.lane][self.index-1].x - gap2))):
@@ -180,6 +194,7 @@ class Vehicle(pygame.sprite.Sprite):
             if self.crossed == 0 and self.y + self.currentImage.get_rect().height > stopLines[self.direction]:
                 self.crossed = 1
                 vehicles[self.direction]['crossed'] += 1
+                waiting[self.direction][self.vehicleClass] -= 1
 
             if ((self.y + self.currentImage.get_rect().height <= self.stop or self.crossed == 1 or (currentGreen == 1 and currentYellow == 0)) and
                 (self.index == 0 or self.y + self.currentImage.get_rect().height < (vehicles[self.direction][self.lane][self.index-1].y - gap2))):
@@ -189,6 +204,7 @@ class Vehicle(pygame.sprite.Sprite):
             if self.crossed == 0 and self.x < stopLines[self.direction]:
                 self.crossed = 1
                 vehicles[self.direction]['crossed'] += 1
+                waiting[self.direction][self.vehicleClass] -= 1
 
             if ((self.x >= self.stop or self.crossed == 1 or (currentGreen == 2 and currentYellow == 0)) and
                 (self.index == 0 or self.x > (vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2))):
@@ -198,6 +214,7 @@ class Vehicle(pygame.sprite.Sprite):
             if self.crossed == 0 and self.y < stopLines[self.direction]:
                 self.crossed = 1
                 vehicles[self.direction]['crossed'] += 1
+                waiting[self.direction][self.vehicleClass] -= 1
 
             if ((self.y >= self.stop or self.crossed == 1 or (currentGreen == 3 and currentYellow == 0)) and
                 (self.index == 0 or self.y > (vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height + gap2))):
@@ -208,29 +225,12 @@ class Vehicle(pygame.sprite.Sprite):
 # ----------------------------
 def count_waiting(direction_key):
     """Count vehicles that haven't crossed the stop line yet for a direction."""
-    count = 0
-    for lane_id in (0, 1, 2):
-        for v in vehicles[direction_key][lane_id]:
-            if v.crossed == 0:
-                count += 1
-    return count
+    return sum(waiting[direction_key].values())
 
 def estimate_green_time(direction_key):
     """Estimate green time from weighted vehicle classes waiting at the stop."""
-    nCars = nBuses = nTrucks = nRick = nBikes = 0
-    for lane_id in (0, 1, 2):
-        for v in vehicles[direction_key][lane_id]:
-            if v.crossed == 0:
-                if v.vehicleClass == 'car':
-                    nCars += 1
-                elif v.vehicleClass == 'bus':
-                    nBuses += 1
-                elif v.vehicleClass == 'truck':
-                    nTrucks += 1
-                elif v.vehicleClass == 'rickshaw':
-                    nRick += 1
-                elif v.vehicleClass == 'bike':
-                    nBikes += 1
+    counts = waiting[direction_key]
+    nCars, nBuses, nTrucks, nRick, nBikes = counts['car'], counts['bus'], counts['truck'], counts['rickshaw'], counts['bike']
 
     g = math.ceil(((nCars*carTime) + (nRick*rickshawTime) + (nBuses*busTime) + (nTrucks*truckTime) + (nBikes*bikeTime)) / (noOfLanes + 1))
     if g < defaultMinimum: g = defaultMinimum
@@ -282,56 +282,57 @@ def setTime():
     signals[chosen].green = greenTime
     print(f'[Prepare] Next green -> TS {chosen+1} ({dir_key}), green={greenTime}s')
 
+# Signal cycle of this script, on the module globals in wall-clock time; the headless engine's
+# queryable state machine is controller.PhaseController (WaitingPolicy ports this choice)
 def repeat():
     global currentGreen, currentYellow, nextGreen
-    prepared = False
+    while True:   # one signal cycle per iteration; no recursion
+        prepared = False
 
-    while signals[currentGreen].green > 0:
-        printStatus()
-        updateValues()
+        while signals[currentGreen].green > 0:
+            printStatus()
+            updateValues()
 
-        # Prepare next choice when current green reaches detectionTime (once)
-        if signals[currentGreen].green == detectionTime and not prepared:
-            setTime()
-            prepared = True
+            # Prepare next choice when current green reaches detectionTime (once)
+            if signals[currentGreen].green == detectionTime and not prepared:
+                setTime()
+                prepared = True
 
-        time.sleep(1)
+            time.sleep(1)
 
-    currentYellow = 1
-    vehicleCountTexts[currentGreen] = "0"
+        currentYellow = 1
+        vehicleCountTexts[currentGreen] = "0"
 
-    # reset per-lane stops for current direction
-    for i in range(0, 3):
-        stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
-        for vehicle in vehicles[directionNumbers[currentGreen]][i]:
-            vehicle.stop = defaultStop[directionNumbers[currentGreen]]
+        # reset per-lane stops for current direction
+        for i in range(0, 3):
+            stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
+            for vehicle in vehicles[directionNumbers[currentGreen]][i]:
+                vehicle.stop = defaultStop[directionNumbers[currentGreen]]
 
-    while signals[currentGreen].yellow > 0:
-        printStatus()
-        updateValues()
-        time.sleep(1)
-
-    currentYellow = 0
+        while signals[currentGreen].yellow > 0:
+            printStatus()
+            updateValues()
+            time.sleep(1)
 
-    # Reset old current to defaults for next cycles
-    signals[currentGreen].green = defaultGreen
-    signals[currentGreen].yellow = defaultYellow
-    signals[currentGreen].red = defaultRed
+        currentYellow = 0
 
-    # If we didn't prepare (short green), choose now
-    if nextGreen is None:
-        setTime()
+        # Reset old current to defaults for next cycles
+        signals[currentGreen].green = defaultGreen
+        signals[currentGreen].yellow = defaultYellow
+        signals[currentGreen].red = defaultRed
 
-    # Switch to prepared choice
-    currentGreen = nextGreen
-    nextGreen = None
+        # If we didn't prepare (short green), choose now
+        if nextGreen is None:
+            setTime()
 
-    # (Optional) set a hint red for fairness display; otherwise leave defaults
-    # Here we set the "future next" red to current's cycle length for visual cue
-    future_next = (currentGreen + 1) % noOfSignals
-    signals[future_next].red = signals[currentGreen].yellow + signals[currentGreen].green
+        # Switch to prepared choice
+        currentGreen = nextGreen
+        nextGreen = None
 
-    repeat()
+        # (Optional) set a hint red for fairness display; otherwise leave defaults
+        # Here we set the "future next" red to current's cycle length for visual cue
+        future_next = (currentGreen + 1) % noOfSignals
+        signals[future_next].red = signals[currentGreen].yellow + signals[currentGreen].green
 
 def printStatus():
     for i in range(0, noOfSignals):
@@ -360,13 +361,13 @@ def updateValues():
 # ----------------------------
 def generateVehicles():
     while True:
-        vehicle_type = random.randint(0,4)
+        vehicle_type = rng.randint(0,4)
         if vehicle_type == 4:
             lane_number = 0
         else:
-            lane_number = random.randint(0,1) + 1
+            lane_number = rng.randint(0,1) + 1
 
-        temp = random.randint(0,999)
+        temp = rng.randint(0,999)
         direction_number = 0
         a = [400,800,900,1000]
         if temp < a[0]:
@@ -420,6 +421,7 @@ class Main:
 
     screen = pygame.display.set_mode(screenSize)
     pygame.display.set_caption("SIMULATION")
+    assets.preload()
 
     redSignal = pygame.image.load('images/signals/red.png')
     yellowSignal = pygame.image.load('images/signals/yellow.png')
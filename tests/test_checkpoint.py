@@ -0,0 +1,31 @@
+import checkpoint
+from demand import recordArrivals, writeArrivals
+from engine import Engine, Settings
+
+def resumed(make, ticks):
+    engine = make()
+    for tick in range(ticks):
+        engine.step()
+    engine = checkpoint.loads(checkpoint.dumps(engine))
+    engine.run()
+    return engine.fingerprint()
+
+def test_resume_matches_an_uninterrupted_run():
+    make = lambda: Engine(Settings(simTime=60, seed=7, recordEvents=True))
+    engine = make()
+    engine.run()
+    assert resumed(make, 1500) == engine.fingerprint()
+
+def test_resume_replays_a_csv_trace_with_blank_lines(tmp_path):
+    path = str(tmp_path / 'trace.csv')
+    writeArrivals(path, recordArrivals(Settings(simTime=60, seed=7)))
+    with open(path) as f:
+        lines = f.read().splitlines()
+    with open(path, 'w') as f:     # a blank line after the header and after every third arrival
+        f.write(lines[0] + '\n\n')
+        for i, line in enumerate(lines[1:]):
+            f.write(line + ('\n\n' if i % 3 == 2 else '\n'))
+    make = lambda: Engine(Settings(simTime=60, seed=7, recordEvents=True, demand=path))
+    engine = make()
+    engine.run()
+    assert resumed(make, 1500) == engine.fingerprint()
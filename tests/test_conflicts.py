@@ -0,0 +1,38 @@
+from engine import Engine, Settings, startX, startY
+
+def overlap(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+def box(vehicle):
+    return (vehicle.x, vehicle.y, vehicle.width, vehicle.height)
+
+# The box a vehicle would have if it had kept to its lane: adjacent lanes of an approach touch even when
+# nothing turns, so only the part of a turn outside the vehicle's own lane counts as sweeping into another
+def laneBox(vehicle):
+    w, h = vehicle.originalSize
+    if vehicle.direction in ('right', 'left'):
+        return (vehicle.x, startY[vehicle.direction][vehicle.lane], vehicle.width, h)
+    return (startX[vehicle.direction][vehicle.lane], vehicle.y, w, vehicle.height)
+
+# Ticks in which a vehicle part way through its turn sweeps into a vehicle in another lane of its approach
+def sweeps(conflictChecks, seed):
+    engine = Engine(Settings(simTime=300, seed=seed, conflictChecks=conflictChecks))
+    count = 0
+    while not engine.finished:
+        engine.step()
+        for vehicle in engine.simulation:
+            if vehicle.rotateAngle and not vehicle.turned:
+                for other in engine.simulation:
+                    if other.direction == vehicle.direction and other.lane != vehicle.lane and overlap(box(vehicle), box(other)) and not overlap(laneBox(vehicle), box(other)):
+                        count += 1
+    return count, engine.conflictHolds
+
+def test_turns_give_way_to_other_lanes_of_their_approach():
+    for seed in (1, 7):
+        unchecked, holds = sweeps(False, seed)
+        assert holds == 0
+        checked, holds = sweeps(True, seed)
+        assert holds > 0
+        assert checked < unchecked / 2
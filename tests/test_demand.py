@@ -0,0 +1,15 @@
+from demand import ProfileDemand
+from engine import Engine, Settings
+
+def test_all_zero_profile_ends_demand():
+    for period in (None, 86400):
+        engine = Engine(Settings(simTime=10, seed=1, demand=ProfileDemand([0, 0, 0, 0], period=period)))
+        assert engine.demand.nextTick() is None
+        results = engine.run()
+        assert engine.spawned == 0
+        assert sum(results['crossed']) == 0
+
+def test_profile_with_arrivals_spawns():
+    engine = Engine(Settings(simTime=30, seed=1, demand=ProfileDemand([3600, 0, 0, 0], period=60)))
+    engine.run()
+    assert engine.spawned > 0
@@ -0,0 +1,96 @@
+import pytest
+
+from engine import Settings, directionNumbers, vehicleTypes
+from env import TrafficEnv, VectorEnv, actionCount
+
+def test_step_rejects_actions_that_are_not_approaches():
+    env = TrafficEnv(Settings(simTime=5, seed=1))
+    env.reset()
+    for action in (-1, actionCount, 1.5, None, '1'):
+        with pytest.raises(ValueError):
+            env.step(action)
+    env.step(actionCount - 1)
+    env.close()
+
+def test_observed_queues_match_the_lanes():
+    env = TrafficEnv(Settings(simTime=60, seed=3))
+    env.reset()
+    for action in (0, 0, 1, 2, 3, 3, 2, 1) * 3:
+        observation = env.step(action)[0]
+        counts = [0]*(4*3*len(vehicleTypes))
+        for d, direction in directionNumbers.items():
+            for lane in range(3):
+                for vehicle in env.engine.vehicles[direction][lane]:
+                    if not vehicle.crossed:
+                        counts[(d*3 + lane)*len(vehicleTypes) + list(vehicleTypes.values()).index(vehicle.vehicleClass)] += 1
+        assert observation[:len(counts)] == counts
+    assert sum(counts) > 0
+    env.close()
+
+def test_green_seconds_count_green_only():
+    env = TrafficEnv(Settings(simTime=200, seed=1), stepTime=0.5)
+    env.reset()
+    seen = []     # (yellow, green seconds) per step, through the first green and its yellow
+    while not any(isYellow for isYellow, elapsed in seen) or seen[-1][0]:
+        observation = env.step(0)[0]
+        seen.append((observation[64], observation[65]))
+    seen.pop()    # the first step of the next green
+    yellow = [elapsed for isYellow, elapsed in seen if isYellow]
+    green = [elapsed for isYellow, elapsed in seen if not isYellow]
+    assert yellow and len(set(yellow)) == 1
+    assert yellow[0] == max(green) == env.engine.settings.defaultMaximum    # serving 0 throughout extends it to the maximum
+    env.close()
+
+def test_serving_the_current_approach_extends_its_green():
+    settings = Settings(simTime=400, seed=1)
+    env = TrafficEnv(settings)
+    env.reset()
+    controller = env.engine.controller
+    while controller.currentGreen != 2 or controller.currentYellow:
+        env.step(2)
+    signal = env.engine.signals[2]
+    granted = env.policy.greenElapsed(env.engine) + signal.green
+    assert granted == settings.defaultMinimum
+    env.step(2)
+    assert env.policy.greenElapsed(env.engine) + signal.green > granted
+    longest = 0
+    while controller.currentGreen == 2 and not controller.currentYellow:
+        longest = max(longest, env.policy.greenElapsed(env.engine) + signal.green)
+        env.step(2)
+    assert longest == settings.defaultMaximum
+    assert env.policy.greenElapsed(env.engine) == settings.defaultMaximum
+    env.close()
+
+# Rewards of each episode of each environment, with the actions taken in it
+def episodes(settings, actions, seed=None):
+    envs = VectorEnv(2, settings, stepTime=5.0)
+    envs.reset(seed)
+    finished = [[], []]
+    current = [[], []]
+    for action in actions:
+        observations, rewards, dones, infos = envs.step([action, action])
+        for i in range(2):
+            current[i].append((action, rewards[i]))
+            if dones[i]:
+                finished[i].append(current[i])
+                current[i] = []
+    envs.close()
+    return finished
+
+def test_auto_reset_episodes_are_seeded_in_sequence():
+    settings = Settings(simTime=20)
+    actions = [0, 1, 2, 3, 1, 0, 2, 1]
+    played = episodes(settings, actions, seed=10)
+    assert played == episodes(settings, actions, seed=10)
+    for i in range(2):
+        assert len(played[i]) >= 2
+        for k, episode in enumerate(played[i]):
+            env = TrafficEnv(settings, stepTime=5.0)
+            env.reset(10 + i + 2*k)
+            assert [(action, env.step(action)[1]) for action, reward in episode] == episode
+
+def test_settings_seed_seeds_every_episode():
+    actions = [0, 1, 2, 3, 1, 0, 2, 1]
+    played = episodes(Settings(simTime=20, seed=10), actions)
+    assert played == episodes(Settings(simTime=20), actions, seed=10)
+    assert played[0][0] != played[0][1]
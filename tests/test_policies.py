@@ -0,0 +1,28 @@
+from engine import Engine, Settings
+from policies import WaitingPolicy
+
+# Records the queues at every detection and which approach each choice then served
+class RecordingWaitingPolicy(WaitingPolicy):
+    def __init__(self):
+        WaitingPolicy.__init__(self)
+        self.detected = []
+        self.chosen = []
+
+    def detect(self, engine):
+        current = engine.controller.currentGreen
+        self.detected.append([sum(engine.waitingByClass(i).values()) if i != current else -1 for i in range(4)])
+        WaitingPolicy.detect(self, engine)
+
+    def choose(self, engine, current):
+        choice = WaitingPolicy.choose(self, engine, current)
+        self.chosen.append(choice[0])
+        return choice
+
+def test_waiting_policy_serves_the_longest_queue_at_detection():
+    policy = RecordingWaitingPolicy()
+    Engine(Settings(simTime=300, seed=1, policy=policy)).run()
+    assert len(policy.chosen) > 5
+    assert len(policy.detected) - len(policy.chosen) in (0, 1)     # the run can end between the two
+    for counts, chosen in zip(policy.detected, policy.chosen):
+        if max(counts) > 0:
+            assert counts[chosen] == max(counts)
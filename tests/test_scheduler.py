@@ -0,0 +1,20 @@
+import scheduler
+from engine import Engine, Settings
+from policies import ActuatedPolicy, MaxPressurePolicy
+
+def fingerprints(makePolicy, seed):
+    direct = Engine(Settings(simTime=120, seed=seed, recordEvents=True, policy=makePolicy()))
+    direct.run()
+    scheduled = Engine(Settings(simTime=120, seed=seed, recordEvents=True, policy=makePolicy()))
+    scheduler.run([scheduled])
+    return direct.fingerprint(), scheduled.fingerprint()
+
+def test_fixed_matches_engine_run():
+    direct, scheduled = fingerprints(lambda: 'fixed', 1)
+    assert scheduled == direct
+
+def test_real_time_policies_match_engine_run():
+    for makePolicy in (lambda: MaxPressurePolicy(margin=6), ActuatedPolicy):
+        for seed in (1, 4):
+            direct, scheduled = fingerprints(makePolicy, seed)
+            assert scheduled == direct
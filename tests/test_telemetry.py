@@ -0,0 +1,56 @@
+import io
+import time
+
+from engine import Engine, Settings
+from runner import EngineRunner
+from telemetry import RingBufferSink, TelemetryWriter
+
+def waitFor(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_status_events_are_passed_on_without_waiting_for_a_full_batch():
+    sink = RingBufferSink()
+    writer = TelemetryWriter([sink], flushOn=('status',))
+    engine = Engine(Settings(simTime=3, seed=1), telemetry=writer)
+    while not engine.finished:
+        engine.step()
+    assert waitFor(lambda: any(event[1] == 'status' for event in sink.events()))
+    writer.close()
+
+def test_verbose_engine_prints_status_while_running():
+    out = io.StringIO()
+    engine = Engine(Settings(simTime=3, seed=1, verbose=True))
+    engine.telemetry.sinks[0].out = out
+    for tick in range(engine.settings.ticks(2)):
+        engine.step()
+    assert waitFor(lambda: 'TS 1' in out.getvalue())
+    engine.close()
+
+def test_stopping_the_runner_closes_the_engine():
+    sink = RingBufferSink()
+    engine = Engine(Settings(simTime=300, seed=1), telemetry=TelemetryWriter([sink]))
+    runner = EngineRunner(engine, speed=50.0)
+    runner.start()
+    assert waitFor(lambda: engine.tick > 60)
+    runner.stop()
+    assert engine.telemetry is None
+    assert any(event[1] == 'spawn' for event in sink.events())
+
+class FailingSink(RingBufferSink):
+    def write(self, batch):
+        raise IOError("disk full")
+
+def test_a_failing_sink_does_not_stop_the_writer(capsys):
+    sink = RingBufferSink()
+    writer = TelemetryWriter([FailingSink(), sink], batchSize=10, maxBatches=2)
+    for i in range(100):
+        writer.publish((i, 'status', 0, 0, ()))
+        if i % 10 == 9:
+            assert waitFor(lambda: writer.queue.empty())
+    writer.close()
+    assert writer.errors == 10
+    assert len(sink.events()) == 100
+    assert 'disk full' in capsys.readouterr().err
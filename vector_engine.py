@@ -0,0 +1,300 @@
+# Vectorized headless engine
+# Same rules as engine.py, but vehicle state is kept in struct-of-arrays NumPy
+# buffers (positions, sizes, speeds, stop coordinates, crossed/turned flags and
+# leader indices) and each tick moves every vehicle in one batched update, so a
+# scenario can carry tens of thousands of vehicles without per-object overhead.
+#
+# In Engine a vehicle sees its leader after the leader has moved this frame;
+# here every vehicle sees positions from the start of the tick, so counts are
+# close to, but not always identical with, Engine's for the same seed.
+
+import sys
+
+import numpy as np
+
+from engine import (Engine, Settings, directionNumbers, vehicleTypes, speeds, startX, startY, stopLines,
+                    defaultStop, mid, gap, gap2, rotationAngle, screenWidth, screenHeight, imageSize, rotatedSize,
+                    carTime, busTime, truckTime, rickshawTime, bikeTime, simTime)
+
+classNumbers = {vehicleClass: number for number, vehicleClass in vehicleTypes.items()}
+rotationSteps = 90 // rotationAngle
+
+# Per-direction constants, indexed by direction number (right, down, left, up)
+sign = np.array([1.0, 1.0, -1.0, -1.0])            # right/down move up their axis, left/up down it
+alongX = np.array([True, False, True, False])       # axis travelled before any turn
+stopLineAt = np.array([stopLines['right'], stopLines['down'], stopLines['left'], stopLines['up']], dtype=float)
+defaultStopAt = np.array([defaultStop['right'], defaultStop['down'], defaultStop['left'], defaultStop['up']], dtype=float)
+midAt = np.array([mid['right']['x'], mid['down']['y'], mid['left']['x'], mid['up']['y']], dtype=float)
+turnDx = np.array([2.0, -2.5, -1.8, 1.0])           # per-frame nudge while rotating, as in Vehicle.move()
+turnDy = np.array([1.8, 2.0, -2.5, -1.0])
+afterDx = np.array([0.0, -1.0, 0.0, 1.0])           # direction of travel once turned
+afterDy = np.array([1.0, 0.0, -1.0, 0.0])
+speedOf = np.array([speeds[vehicleTypes[c]] for c in range(len(vehicleTypes))])
+serviceTimes = np.array([carTime, busTime, truckTime, rickshawTime, bikeTime])    # in vehicleTypes order
+
+# Bounding box (w, h) of every [direction, class, rotation step]
+sizeTable = np.zeros((4, len(vehicleTypes), rotationSteps+1, 2))
+for d in range(4):
+    for c in range(len(vehicleTypes)):
+        w, h = imageSize(directionNumbers[d], vehicleTypes[c])
+        for step in range(rotationSteps+1):
+            sizeTable[d, c, step] = rotatedSize(w, h, step*rotationAngle)
+
+# Struct-of-arrays layout: name -> dtype
+fields = {
+    'x': np.float64, 'y': np.float64, 'w': np.float64, 'h': np.float64, 'speed': np.float64, 'stop': np.float64,
+    'direction': np.int8, 'lane': np.int8, 'vclass': np.int8, 'angle': np.int16,
+    'crossed': np.bool_, 'willTurn': np.bool_, 'turned': np.bool_, 'alive': np.bool_,
+    'leader': np.int64,     # slot of the vehicle ahead in the same lane, -1 if none
+    'vid': np.int64, 'spawnTick': np.int64, 'firstStop': np.int64, 'stopCount': np.int32, 'isStopped': np.bool_, 'resumedAt': np.int64,
+}
+
+
+class VectorEngine(Engine):
+    def __init__(self, settings=None, telemetry=None, capacity=1024):
+        Engine.__init__(self, settings, telemetry)
+        if self.settings.conflictChecks:
+            raise ValueError("conflictChecks needs Engine, VectorEngine moves vehicles in batches")
+        self.capacity = capacity
+        self.count = 0          # slots in use; retired slots stay until compact()
+        for name, dtype in fields.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.tails = np.full((4, 3), -1, dtype=np.int64)    # last vehicle in each [direction, lane]
+        self.crossedTotals = np.zeros(4, dtype=np.int64)
+        self.waitingCounts = np.zeros((4, len(vehicleTypes)), dtype=np.int64)    # [direction, class], not yet crossed
+        self.aliveCount = 0
+
+    # Every vehicle in one batched update instead of Vehicle.move() one at a time
+    def moveVehicles(self):
+        if self.count:
+            self.moveAll()
+            self.retireOffScreen()
+
+    # Batched Vehicle.move() for every slot
+    def moveAll(self):
+        n = self.count
+        x, y, w, h = self.x[:n], self.y[:n], self.w[:n], self.h[:n]
+        d = self.direction[:n]
+        alive = self.alive[:n]
+        crossed = self.crossed[:n]
+        turned = self.turned[:n]
+        stop = self.stop[:n]
+        speed = self.speed[:n]
+        s = sign[d]
+        ax = alongX[d]
+
+        pos = np.where(ax, x, y)
+        front = np.where(s > 0, pos + np.where(ax, w, h), pos)
+        sFront = s * front
+
+        # crossing the stop line
+        newly = alive & ~crossed & (sFront > s * stopLineAt[d])
+        if newly.any():
+            crossed |= newly
+            self.crossedTotals += np.bincount(d[newly], minlength=4)
+            np.add.at(self.waitingCounts, (d[newly], self.vclass[:n][newly]), -1)
+            for i in np.flatnonzero(newly):
+                self.metrics.crossed(int(d[i]), int(self.spawnTick[i]), int(self.firstStop[i]), int(self.stopCount[i]),
+                                     self.tick, bool(self.isStopped[i]))
+                if self.tracing:
+                    wait = (self.tick - self.firstStop[i]) / self.settings.frameRate if self.firstStop[i] >= 0 else 0.0
+                    self.emit('cross', int(self.vid[i]), int(d[i]), int(self.lane[i]), float(wait))
+            self.isStopped[:n][newly] = False
+
+        # leader state at the start of the tick
+        leader = self.leader[:n]
+        hasLeader = leader >= 0
+        li = np.where(hasLeader, leader, 0)
+        lx, ly, lw, lh = x[li], y[li], w[li], h[li]
+        leaderTurned = hasLeader & turned[li]
+        leaderPos = np.where(ax, lx, ly)
+        leaderRear = np.where(s > 0, leaderPos, leaderPos + np.where(ax, lw, lh))
+        gapOK = ~hasLeader | (sFront < s * leaderRear - gap2) | leaderTurned
+
+        controller = self.controller
+        green = (d == controller.currentGreen) & (controller.currentYellow == 0)
+        go = ((sFront <= s * stop) | crossed | green) & gapOK
+
+        inTurn = self.willTurn[:n] & crossed & (sFront >= s * midAt[d])
+        straight = alive & ~inTurn & go
+        rotating = alive & inTurn & ~turned
+        afterTurn = alive & inTurn & turned
+
+        # turned vehicles only check the leader on their new heading
+        followOK = np.select(
+            [d == 0, d == 1, d == 2],
+            [(y + h < ly - gap2) | (x + w < lx - gap2),
+             (x > lx + lw + gap2) | (y < ly - gap2),
+             (y > ly + lh + gap2) | (x > lx + gap2)],
+            (x < lx - lw - gap2) | (y > ly + gap2))
+        afterTurn &= ~hasLeader | followOK
+
+        advance = np.where(straight, s * speed, 0.0)
+        dx = np.where(ax, advance, 0.0)
+        dy = np.where(ax, 0.0, advance)
+        afterStep = np.where(afterTurn, speed, 0.0)
+        dx += afterDx[d] * afterStep
+        dy += afterDy[d] * afterStep
+        self.trackStops(alive & ~crossed & (dx == 0) & (dy == 0), alive & ~crossed)
+        if rotating.any():
+            dx += np.where(rotating, turnDx[d], 0.0)
+            dy += np.where(rotating, turnDy[d], 0.0)
+            angle = self.angle[:n]
+            angle[rotating] += rotationAngle
+            r = np.flatnonzero(rotating)
+            sizes = sizeTable[d[r], self.vclass[r], angle[r] // rotationAngle]
+            w[r] = sizes[:, 0]
+            h[r] = sizes[:, 1]
+            turned[r] = angle[r] == 90
+            if self.tracing:
+                for i in r:
+                    if angle[i] == rotationAngle:
+                        self.emit('turnStart', int(self.vid[i]), int(d[i]), int(self.lane[i]))
+                    elif angle[i] == 90:
+                        self.emit('turnEnd', int(self.vid[i]), int(d[i]), int(self.lane[i]))
+        x += dx
+        y += dy
+
+    # Feed stop/resume transitions of vehicles before the stop line to the metrics
+    def trackStops(self, stoppedNow, waiting):
+        n = self.count
+        isStopped = self.isStopped[:n]
+        started = stoppedNow & ~isStopped
+        resumed = waiting & isStopped & ~stoppedNow
+        if started.any():
+            first = self.firstStop[:n]
+            counted = started & ((first < 0) | (self.tick - self.resumedAt[:n] >= self.metrics.minRunTicks))
+            first[started & (first < 0)] = self.tick
+            self.stopCount[:n][counted] += 1
+            for d, k in enumerate(np.bincount(self.direction[:n][started], minlength=4)):
+                if k:
+                    self.metrics.stopped(d, int(k))
+            if self.tracing:
+                for i in np.flatnonzero(started):
+                    self.emit('stop', int(self.vid[i]), int(self.direction[i]), int(self.lane[i]))
+        if resumed.any():
+            for d, k in enumerate(np.bincount(self.direction[:n][resumed], minlength=4)):
+                if k:
+                    self.metrics.resumed(d, int(k))
+        isStopped[started] = True
+        isStopped[resumed] = False
+        self.resumedAt[:n][resumed] = self.tick
+
+    # Retire crossed vehicles that have left the screen and repoint their followers
+    def retireOffScreen(self):
+        n = self.count
+        x, y, w, h = self.x[:n], self.y[:n], self.w[:n], self.h[:n]
+        alive = self.alive[:n]
+        off = alive & self.crossed[:n] & ((x > screenWidth) | (y > screenHeight) | (x + w < 0) | (y + h < 0))
+        if not off.any():
+            return
+        alive &= ~off
+        gone = int(off.sum())
+        self.aliveCount -= gone
+        self.retired += gone
+        leader = self.leader[:n]
+        while True:     # leaders always sit at lower slots, so this ends
+            hasLeader = leader >= 0
+            dead = np.zeros(n, dtype=bool)
+            dead[hasLeader] = ~alive[leader[hasLeader]]
+            if not dead.any():
+                break
+            leader[dead] = leader[leader[dead]]
+        tails = self.tails
+        for d in range(4):
+            for lane in range(3):
+                t = tails[d, lane]
+                if t >= 0 and not alive[t]:
+                    tails[d, lane] = leader[t]
+        if n - self.aliveCount > max(1024, self.aliveCount):
+            self.compact()
+
+    # Drop retired slots and renumber leaders and lane tails
+    def compact(self):
+        n = self.count
+        keep = np.flatnonzero(self.alive[:n])
+        m = len(keep)
+        remap = np.full(n, -1, dtype=np.int64)
+        remap[keep] = np.arange(m)
+        leader = self.leader[keep]
+        for name in fields:
+            arr = getattr(self, name)
+            arr[:m] = arr[keep]
+        self.leader[:m] = np.where(leader >= 0, remap[np.maximum(leader, 0)], -1)
+        self.alive[m:n] = False
+        self.tails = np.where(self.tails >= 0, remap[np.maximum(self.tails, 0)], -1)
+        self.count = m
+
+    def grow(self):
+        self.capacity *= 2
+        for name, dtype in fields.items():
+            arr = np.zeros(self.capacity, dtype=dtype)
+            arr[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, arr)
+
+    def addVehicle(self, lane, vehicleClass, direction_number, will_turn):
+        if self.count == self.capacity:
+            self.grow()
+        d = direction_number
+        direction = directionNumbers[d]
+        c = classNumbers[vehicleClass]
+        i = self.count
+        w, h = sizeTable[d, c, 0]
+        sx, sy = startX[direction][lane], startY[direction][lane]
+        ahead = self.tails[d, lane]
+        stop = defaultStopAt[d]
+        if ahead >= 0:
+            ax, ay, aw, ah = self.x[ahead], self.y[ahead], self.w[ahead], self.h[ahead]
+            # spawn just behind the last vehicle in the lane, as Engine.resetSpawn() does
+            if direction == 'right':
+                sx = min(sx, ax - aw - gap)
+            elif direction == 'left':
+                sx = max(sx, ax + aw + gap)
+            elif direction == 'down':
+                sy = min(sy, ay - ah - gap)
+            else:
+                sy = max(sy, ay + ah + gap)
+            if not self.crossed[ahead]:
+                along = aw if alongX[d] else ah
+                stop = self.stop[ahead] - sign[d] * (along + gap)
+        self.x[i], self.y[i], self.w[i], self.h[i] = sx, sy, w, h
+        self.speed[i] = speedOf[c]
+        self.stop[i] = stop
+        self.direction[i], self.lane[i], self.vclass[i], self.angle[i] = d, lane, c, 0
+        self.crossed[i], self.turned[i], self.alive[i] = False, False, True
+        self.spawnTick[i], self.firstStop[i], self.stopCount[i], self.isStopped[i] = self.tick, -1, 0, False
+        self.resumedAt[i] = 0
+        self.vid[i] = self.spawned
+        self.willTurn[i] = will_turn == 1
+        self.leader[i] = ahead
+        self.tails[d, lane] = i
+        self.waitingCounts[d, c] += 1
+        self.count += 1
+        self.aliveCount += 1
+        return i
+
+    # Yellow started: reset stop coordinates of the approach
+    def onYellow(self, index):
+        n = self.count
+        self.stop[:n][self.direction[:n] == index] = defaultStopAt[index]
+
+    def waitingByClass(self, direction_number):
+        return {vehicleTypes[c]: int(k) for c, k in enumerate(self.waitingCounts[direction_number])}
+
+    # Waiting vehicles weighted by class service time, straight from the counters
+    def pressure(self, direction_number):
+        return float(self.waitingCounts[direction_number] @ serviceTimes)
+
+    def crossedCounts(self):
+        return [int(c) for c in self.crossedTotals]
+
+    def onRoad(self):
+        return self.aliveCount
+
+
+if __name__ == '__main__':
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else simTime
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    engine = VectorEngine(Settings(simTime=length, seed=seed))
+    engine.run()
+    engine.report()